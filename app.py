@@ -1,10 +1,16 @@
-from flask import Flask, render_template
+from flask import Flask, render_template, request
 from flask_cors import CORS
 from config import Config
 from database import db, init_db
 
-def create_app(config_class=Config):
-    """Flaskアプリケーションのファクトリー関数"""
+def create_app(config_class=Config, prepare_schema=True):
+    """Flaskアプリケーションのファクトリー関数
+
+    Args:
+        config_class: 設定クラス
+        prepare_schema: テーブル作成・マイグレーションを行うか
+            （gunicornではマスタープロセスで1回だけ行うため、各ワーカーでは False）
+    """
     app = Flask(__name__)
     app.config.from_object(config_class)
 
@@ -13,11 +19,41 @@ def create_app(config_class=Config):
 
     # データベース初期化
     db.init_app(app)
+    with app.app_context():
+        from database.engine import configure_engine
+        configure_engine(app)
+
+        # リクエスト計測（レイテンシ・SQL実行回数）と /metrics
+        from instrumentation import register_instrumentation
+        register_instrumentation(app)
 
     # ルート登録
     from routes import api
     app.register_blueprint(api)
 
+    # 運用コマンド登録
+    from commands import register_commands
+    register_commands(app)
+
+    # 静的ファイルのハッシュ付きURL・レスポンス圧縮
+    # （after_request は登録の逆順に実行されるため、キャッシュヘッダの設定後に圧縮する）
+    from compression import register_compression
+    from static_assets import register_static_assets
+    register_compression(app)
+    register_static_assets(app)
+
+    # 起動状態と /readyz
+    from boot import register_boot, prepare_database, warm_up
+    register_boot(app)
+
+    # リクエストごとに他ワーカーでの変更をプロセス内キャッシュに反映
+    from services.cache_coherence import cache_coherence
+
+    @app.before_request
+    def sync_caches():
+        if request.endpoint != 'static':
+            cache_coherence.check()
+
     # メインページのルート
     @app.route('/')
     def index():
@@ -34,10 +70,37 @@ def create_app(config_class=Config):
         """履歴管理画面"""
         return render_template('history.html')
 
-    # データベーステーブルを作成
     with app.app_context():
-        db.create_all()
-        print("データベーステーブルを初期化しました")
+        # データベーステーブルを作成し、既存データベースへのスキーマ変更を適用
+        if prepare_schema:
+            applied = prepare_database()
+            print("データベーステーブルを初期化しました")
+            if applied:
+                print(f"マイグレーションを適用しました: {', '.join(str(v) for v in applied)}")
+
+        # 他ワーカーでの変更の検出を開始（読み込み中の変更も検出できるよう、読み込みより前に記録する）
+        cache_coherence.reset()
+
+        # 入場判定用のチケットインデックスを読み込み
+        from services.ticket_index import ticket_index
+        count = ticket_index.load()
+        print(f"チケットインデックスを読み込みました: {count}件")
+
+        # 入園履歴のライトビハインド書き込みを開始
+        # （前回の異常終了で残った履歴を先に取り込み、当日入場カウンタの読み込みに含める）
+        if app.config.get('ENTRY_WRITE_BEHIND'):
+            from services.entry_queue import entry_write_queue
+            entry_write_queue.start(app)
+            print("入園履歴のライトビハインド書き込みを開始しました")
+
+        # 当日の入場状況をカウンタに読み込み
+        from services.entry_counter import today_entry_counter
+        count = today_entry_counter.load()
+        print(f"当日入場カウンタを読み込みました: {count}件")
+
+    # 接続プール・テンプレート・判定応答のキャッシュを準備
+    warmup_ms = warm_up(app)
+    print(f"ウォームアップが完了しました: {warmup_ms}ms")
 
     return app
 
@@ -0,0 +1,309 @@
+"""入場判定まわりの負荷テスト・ベンチマーク
+
+一時ディレクトリのSQLiteに合成チケットとN日分の入園履歴を投入し、
+入場判定・履歴一覧・入園集計・CSV出力・CSV一括登録を指定の並列度で実行して
+レイテンシ（p50/p95/p99）とスループットを表示する。外部サービスは不要。
+
+実行例:
+    python benchmarks/gate_benchmark.py
+    python benchmarks/gate_benchmark.py --tickets 50000 --days 365 --scans-per-day 3000 --concurrency 8
+    python benchmarks/gate_benchmark.py --scenarios judge,history --requests 5000 --json
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+# リポジトリ直下のモジュールを読み込めるようにする
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = ['judge', 'batch', 'history', 'stats', 'export', 'import']
+
+
+def parse_args(argv=None):
+    """コマンドライン引数を解析"""
+    parser = argparse.ArgumentParser(description='入場判定まわりのベンチマーク')
+    parser.add_argument('--tickets', type=int, default=10000, help='投入するチケット数')
+    parser.add_argument('--days', type=int, default=90, help='投入する入園履歴の日数')
+    parser.add_argument('--scans-per-day', type=int, default=1000, help='1日あたりの入園履歴数')
+    parser.add_argument('--concurrency', type=int, default=4, help='並列実行数（ゲート数）')
+    parser.add_argument('--requests', type=int, default=2000, help='シナリオごとのリクエスト数（exportとimportは1/100）')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"実行するシナリオ（{','.join(SCENARIOS)}）")
+    parser.add_argument('--import-rows', type=int, default=5000, help='CSV一括登録1回あたりの行数')
+    parser.add_argument('--db', help='使用するSQLiteファイル（省略時は一時ファイル。既存データがあれば投入を省略）')
+    parser.add_argument('--seed', type=int, default=1, help='乱数シード')
+    parser.add_argument('--json', action='store_true', help='結果をJSONで出力')
+    return parser.parse_args(argv)
+
+
+def create_benchmark_app(db_path, upload_folder):
+    """ベンチマーク用のアプリケーションを作成"""
+    from config import Config
+    from app import create_app
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        UPLOAD_FOLDER = upload_folder
+
+    return create_app(BenchmarkConfig)
+
+
+def seed_database(app, tickets, days, scans_per_day, rng):
+    """合成チケットとN日分の入園履歴を投入（既にチケットがある場合は何もしない）"""
+    from sqlalchemy import insert
+    from database import db
+    from models.ticket import Ticket
+    from models.entry_log import EntryLog
+    from services.ticket_index import ticket_index
+    from services.entry_counter import today_entry_counter
+    from services.attendance_stats import AttendanceStatsService
+
+    with app.app_context():
+        if Ticket.query.limit(1).count():
+            return False
+
+        today = date.today()
+        now = datetime.utcnow()
+        chunk = []
+        for i in range(tickets):
+            start_date = today - timedelta(days=rng.randint(0, 400))
+            chunk.append({
+                'tkt_number': str(100000 + i),
+                'age': rng.randint(0, 90),
+                'gender': rng.choice(['男性', '女性', 'それ以外']),
+                'ticket_type': rng.choice(['大人', '子供']),
+                'start_date': start_date,
+                'expiry_date': start_date + timedelta(days=365),
+                'is_transfer': False,
+                'created_at': now,
+                'updated_at': now
+            })
+            if len(chunk) >= 5000:
+                db.session.execute(insert(Ticket), chunk)
+                chunk = []
+        if chunk:
+            db.session.execute(insert(Ticket), chunk)
+        db.session.commit()
+
+        for day in range(days, 0, -1):
+            day_start = datetime.combine(today - timedelta(days=day), datetime.min.time()) + timedelta(hours=9)
+            rows = []
+            for _ in range(scans_per_day):
+                rows.append({
+                    'tkt_number': str(100000 + rng.randrange(tickets)),
+                    'entry_time': day_start + timedelta(seconds=rng.randint(0, 9 * 3600)),
+                    'result': 'OK' if rng.random() < 0.95 else 'NG',
+                    'comment': '',
+                    'is_reentry': False,
+                    'created_at': now
+                })
+            rows.sort(key=lambda row: row['entry_time'])
+            db.session.execute(insert(EntryLog), rows)
+            db.session.commit()
+
+        ticket_index.load()
+        today_entry_counter.load()
+        AttendanceStatsService.rebuild()
+
+    return True
+
+
+def percentile(sorted_values, ratio):
+    """ソート済みリストのパーセンタイル（最近傍順位法）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(ratio * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def run_scenario(app, name, operation, total, concurrency):
+    """操作を指定の並列度で total 回実行し、レイテンシを集計"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    local = threading.local()
+
+    def worker(index):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        started = time.perf_counter()
+        try:
+            ok = operation(local.client, index)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'scenario': name,
+        'requests': total,
+        'concurrency': concurrency,
+        'errors': errors[0],
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        'throughput_rps': round(total / wall, 1) if wall > 0 else 0.0
+    }
+
+
+def build_operations(args, rng):
+    """シナリオ名 → (操作, 実行回数)"""
+    today = date.today()
+
+    def random_tkt_number():
+        # 1割は未登録番号
+        if rng.random() < 0.1:
+            return str(900000 + rng.randrange(100000))
+        return str(100000 + rng.randrange(args.tickets))
+
+    def judge(client, index):
+        response = client.post('/api/entry/judge', json={'tkt_number': random_tkt_number()})
+        return response.status_code == 200
+
+    def batch(client, index):
+        now = datetime.now()
+        scans = [
+            {'tkt_number': random_tkt_number(), 'entry_time': (now - timedelta(seconds=rng.randint(0, 3600))).isoformat()}
+            for _ in range(50)
+        ]
+        response = client.post('/api/entry/judge/batch', json={'scans': scans})
+        return response.status_code == 200
+
+    def history(client, index):
+        params = {'limit': 100}
+        choice = rng.random()
+        if choice < 0.3:
+            params['tkt_number'] = random_tkt_number()
+        elif choice < 0.6:
+            day = today - timedelta(days=rng.randint(0, args.days))
+            params['date_from'] = params['date_to'] = day.isoformat()
+        response = client.get('/api/history', query_string=params)
+        if response.status_code != 200:
+            return False
+        # 2ページ目も取得
+        cursor = response.get_json().get('next_cursor')
+        if cursor:
+            params['cursor'] = cursor
+            response = client.get('/api/history', query_string=params)
+        return response.status_code == 200
+
+    def stats(client, index):
+        day = today - timedelta(days=rng.randint(0, args.days))
+        params = {
+            'date_from': (day - timedelta(days=30)).isoformat(),
+            'date_to': day.isoformat(),
+            'group_by': rng.choice(['date', 'hour', 'ticket_type,gender', 'age_band,result,is_reentry'])
+        }
+        response = client.get('/api/stats/attendance', query_string=params)
+        return response.status_code == 200
+
+    def export(client, index):
+        day = today - timedelta(days=rng.randint(0, args.days))
+        params = {'date_from': (day - timedelta(days=30)).isoformat(), 'date_to': day.isoformat()}
+        response = client.get('/api/export/history', query_string=params)
+        for _ in response.response:
+            pass
+        return response.status_code == 200
+
+    def import_csv(client, index):
+        lines = ['TKT番号,年齢,性別,券種,使用開始日,備考']
+        base = 10000000 + index * args.import_rows
+        for i in range(args.import_rows):
+            lines.append(f'{base + i},{rng.randint(0, 90)},女性,大人,{today.strftime("%Y/%m/%d")},')
+        data = {'file': (io.BytesIO('\n'.join(lines).encode('utf-8')), 'benchmark.csv')}
+        response = client.post('/api/tickets/import', data=data, content_type='multipart/form-data')
+        if response.status_code != 202:
+            return False
+        job_id = response.get_json()['job_id']
+        while True:
+            job = client.get(f'/api/tickets/import/{job_id}').get_json()['job']
+            if job['status'] in ('completed', 'failed'):
+                return job['status'] == 'completed'
+            time.sleep(0.05)
+
+    bulk_requests = max(1, args.requests // 100)
+    return {
+        'judge': (judge, args.requests),
+        'batch': (batch, max(1, args.requests // 50)),
+        'history': (history, args.requests),
+        'stats': (stats, args.requests),
+        'export': (export, bulk_requests),
+        'import': (import_csv, bulk_requests)
+    }
+
+
+def format_table(results):
+    """結果を表形式の文字列に変換"""
+    columns = ['scenario', 'requests', 'concurrency', 'errors', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'throughput_rps']
+    widths = {column: max(len(column), *(len(str(result[column])) for result in results)) for column in columns}
+    lines = ['  '.join(column.rjust(widths[column]) for column in columns)]
+    for result in results:
+        lines.append('  '.join(str(result[column]).rjust(widths[column]) for column in columns))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        print(f"不明なシナリオ: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    workdir = tempfile.mkdtemp(prefix='kana_bench_')
+    try:
+        db_path = os.path.abspath(args.db) if args.db else os.path.join(workdir, 'benchmark.db')
+        app = create_benchmark_app(db_path, workdir)
+
+        started = time.perf_counter()
+        seeded = seed_database(app, args.tickets, args.days, args.scans_per_day, rng)
+        seed_seconds = round(time.perf_counter() - started, 2)
+
+        operations = build_operations(args, rng)
+        results = []
+        for name in scenarios:
+            operation, total = operations[name]
+            results.append(run_scenario(app, name, operation, total, args.concurrency))
+
+        if args.json:
+            print(json.dumps({
+                'tickets': args.tickets,
+                'days': args.days,
+                'scans_per_day': args.scans_per_day,
+                'seeded': seeded,
+                'seed_seconds': seed_seconds,
+                'results': results
+            }, ensure_ascii=False, indent=2))
+        else:
+            print(f"データ: チケット{args.tickets}件 / 履歴{args.days}日 × {args.scans_per_day}件"
+                  f"（投入{'実施' if seeded else '省略'} {seed_seconds}秒）")
+            print(format_table(results))
+
+        return 1 if any(result['errors'] for result in results) else 0
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
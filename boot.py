@@ -0,0 +1,123 @@
+"""起動処理（スキーマの準備・ワーカーのウォームアップ・レディネス確認）
+
+- スキーマの作成・マイグレーションはデプロイごとに1回だけ行う。
+  gunicorn.conf.py の on_starting でマスタープロセスが prepare_database_once() を実行し、
+  各ワーカーは create_app(prepare_schema=False) でスキーマ処理を省略する。
+- 各ワーカーは起動時に warm_up() で接続プールの接続・テンプレートのコンパイル・
+  判定応答のキャッシュを準備し、最初のスキャンから通常の速度で応答できるようにする。
+- /readyz はウォームアップが完了し、データベースに接続できる場合のみ 200 を返す。
+  ローリング再起動時はロードバランサのヘルスチェックに指定し、準備中のワーカーにスキャンを振り分けない。
+"""
+import os
+import time
+from datetime import datetime
+from flask import Flask, jsonify, render_template
+from sqlalchemy import text
+from database import db
+
+
+def prepare_database():
+    """テーブル作成と未適用のマイグレーションを実行（アプリケーションコンテキスト内で呼び出す）
+
+    Returns:
+        list: 今回適用したマイグレーションのバージョン
+    """
+    import models  # noqa: F401  db.create_all() の対象となるモデルを読み込む
+    from database.migrations import upgrade
+
+    db.create_all()
+    return upgrade()
+
+
+def prepare_database_once(config_class):
+    """ワーカー起動前にスキーマを準備する（gunicornのマスタープロセスから呼び出す）
+
+    キャッシュの読み込みやバックグラウンド処理は行わず、使用した接続はフォーク前に破棄する。
+    """
+    from database.engine import configure_engine
+
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    db.init_app(app)
+    with app.app_context():
+        configure_engine(app)
+        applied = prepare_database()
+        db.engine.dispose()
+    return applied
+
+
+def warm_up(app):
+    """ワーカーのウォームアップ（チケットインデックス・当日入場カウンタの読み込み後に呼び出す）"""
+    from database.migrations import current_version
+    from services.ticket_index import ticket_index
+    from services.judgement_response import compact_judgement_serializer
+
+    started = time.perf_counter()
+    state = app.extensions['boot']
+
+    with app.app_context():
+        # 接続プールの接続を開いておく（PRAGMAの設定も接続時に済ませる）
+        pool_size = db.engine.pool.size() if hasattr(db.engine.pool, 'size') else 1
+        connections = [db.engine.connect() for _ in range(max(1, pool_size))]
+        try:
+            for connection in connections:
+                connection.execute(text('SELECT 1'))
+        finally:
+            for connection in connections:
+                connection.close()
+
+        state['schema_version'] = current_version()
+
+        # 判定応答のチケット部分を事前に生成
+        compact_judgement_serializer.preload(ticket_index.entries())
+
+    # テンプレートのコンパイルと静的ファイルのハッシュ計算
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        with app.test_request_context('/'):
+            render_template(name)
+
+    state['warmup_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    state['ready_at'] = datetime.now().isoformat(timespec='seconds')
+    state['ready'] = True
+    return state['warmup_ms']
+
+
+def register_boot(app):
+    """起動状態の保持と /readyz を登録"""
+    app.extensions['boot'] = {
+        'ready': False,
+        'ready_at': None,
+        'warmup_ms': None,
+        'schema_version': None
+    }
+
+    @app.route('/readyz')
+    def readyz():
+        """レディネス確認（ゲートの判定を通常の速度で処理できる場合のみ 200）"""
+        from database.migrations import latest_version
+        from services.ticket_index import ticket_index
+        from services.entry_counter import today_entry_counter
+
+        state = app.extensions['boot']
+        checks = {
+            'warmed_up': state['ready'],
+            'schema': (state['schema_version'] or 0) >= latest_version(),
+            'ticket_index': ticket_index.loaded,
+            'entry_counter': today_entry_counter.loaded
+        }
+        try:
+            db.session.execute(text('SELECT 1'))
+            checks['database'] = True
+        except Exception:
+            db.session.rollback()
+            checks['database'] = False
+
+        ready = all(checks.values())
+        return jsonify({
+            'status': 'ready' if ready else 'starting',
+            'checks': checks,
+            'pid': os.getpid(),
+            'ready_at': state['ready_at'],
+            'warmup_ms': state['warmup_ms'],
+            'tickets': len(ticket_index)
+        }), 200 if ready else 503
@@ -0,0 +1,52 @@
+"""運用コマンド（flask --app app <コマンド名> で実行）"""
+import click
+
+
+def register_commands(app):
+    """CLIコマンドを登録"""
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade():
+        """未適用のスキーママイグレーションを適用"""
+        from database import db
+        from database.migrations import upgrade, current_version
+
+        db.create_all()
+        applied = upgrade()
+        if applied:
+            click.echo(f"マイグレーションを適用しました: {', '.join(str(v) for v in applied)}")
+        click.echo(f"現在のスキーマバージョン: {current_version()}")
+
+    @app.cli.command('history-archive')
+    @click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']), help='この日付の月より前をアーカイブ（省略時は ARCHIVE_AFTER_DAYS から算出）')
+    @click.option('--storage', type=click.Choice(['table', 'gzip']), help='アーカイブ先（省略時は ARCHIVE_STORAGE）')
+    @click.option('--vacuum', is_flag=True, help='アーカイブ後にデータベースファイルを縮小（VACUUM）')
+    def history_archive(before, storage, vacuum):
+        """保持期間より古い入園履歴を月単位でアーカイブ"""
+        from sqlalchemy import text
+        from database import db
+        from services.history_archive import HistoryArchiveService
+
+        archived = HistoryArchiveService.archive(before.date() if before else None, storage)
+        for item in archived:
+            click.echo(f"{item['month']}: {item['row_count']}件をアーカイブしました（{item['storage']}）")
+        if not archived:
+            click.echo("アーカイブ対象の入園履歴はありません")
+
+        if vacuum and archived and db.engine.dialect.name == 'sqlite':
+            with db.engine.connect() as conn:
+                conn.execute(text('VACUUM'))
+            click.echo("データベースファイルを縮小しました")
+
+    @app.cli.command('stats-rebuild')
+    @click.option('--date-from', type=click.DateTime(formats=['%Y-%m-%d']), help='開始日（省略時は最も古い履歴の日付）')
+    @click.option('--date-to', type=click.DateTime(formats=['%Y-%m-%d']), help='終了日（省略時は最も新しい履歴の日付）')
+    def stats_rebuild(date_from, date_to):
+        """入園履歴から入園集計を作成（既存データの初回作成・作り直し）"""
+        from services.attendance_stats import AttendanceStatsService
+
+        log_count, stat_count = AttendanceStatsService.rebuild(
+            date_from.date() if date_from else None,
+            date_to.date() if date_to else None
+        )
+        click.echo(f"入園集計を作成しました: 入園履歴{log_count}件 → 集計{stat_count}行")
@@ -0,0 +1,77 @@
+"""レスポンス圧縮（gzip / brotli）
+
+JSON・HTML・CSS・JavaScriptなどのテキスト応答を Accept-Encoding に応じて圧縮する。
+brotli は brotli パッケージがインストールされている場合のみ使用する。
+ストリーミング応答（CSV出力・リアルタイム配信）は逐次送信を優先して圧縮しない。
+静的ファイルは同じ内容を何度も圧縮しないよう、ETagごとに圧縮結果を保持する。
+"""
+import gzip
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 静的ファイルの圧縮結果 (パス, ETag, 方式) → 圧縮後のバイト列
+_static_cache = {}
+_static_cache_lock = threading.Lock()
+
+
+def _choose_encoding(accept_encoding):
+    """クライアントが受け付ける圧縮方式を選択（brotli優先）"""
+    if brotli is not None and 'br' in accept_encoding:
+        return 'br'
+    if 'gzip' in accept_encoding:
+        return 'gzip'
+    return None
+
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level)
+
+
+def register_compression(app):
+    """レスポンス圧縮を登録"""
+    mimetypes = app.config['COMPRESS_MIMETYPES']
+    min_size = app.config['COMPRESS_MIN_SIZE']
+    level = app.config['COMPRESS_LEVEL']
+
+    @app.after_request
+    def compress_response(response):
+        from flask import request
+
+        if (response.status_code != 200
+                or response.is_streamed and not response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in mimetypes):
+            return response
+
+        encoding = _choose_encoding(request.headers.get('Accept-Encoding', ''))
+        response.vary.add('Accept-Encoding')
+        if encoding is None:
+            return response
+
+        is_static = request.endpoint == 'static'
+        etag, _ = response.get_etag()
+        cache_key = (request.path, etag, encoding) if is_static and etag else None
+
+        compressed = _static_cache.get(cache_key) if cache_key else None
+        if compressed is None:
+            response.direct_passthrough = False
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            compressed = _compress(data, encoding, level)
+            if cache_key:
+                with _static_cache_lock:
+                    _static_cache[cache_key] = compressed
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # 圧縮後も同じ検証子で照合できるよう弱いETagにする
+            response.set_etag(etag, weak=True)
+        return response
@@ -8,6 +8,16 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f'sqlite:///{os.path.join(BASE_DIR, "entry_management.db")}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLiteチューニング（Noneの項目は既定値のまま）
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE')  # 例: "WAL"
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS')  # 例: "NORMAL"
+    SQLITE_CACHE_SIZE_KB = None  # ページキャッシュサイズ（KB）
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))  # ロック待ちの最大時間
+
+    # ロック競合時の再試行設定
+    DB_LOCK_RETRIES = 3  # 再試行回数
+    DB_LOCK_RETRY_BACKOFF = 0.05  # 初回の待機秒数（再試行ごとに倍増）
+
     # Flask設定
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
 
@@ -21,8 +31,102 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 最大16MB
     ALLOWED_EXTENSIONS = {'csv'}
 
+    # 入園履歴のライトビハインド設定（有効時は判定結果を先に返し、履歴はまとめて書き込む）
+    ENTRY_WRITE_BEHIND = os.environ.get('ENTRY_WRITE_BEHIND', 'False').lower() == 'true'
+    ENTRY_QUEUE_DIR = os.environ.get('ENTRY_QUEUE_DIR') or os.path.join(BASE_DIR, 'entry_queue')
+    ENTRY_QUEUE_FLUSH_INTERVAL = float(os.environ.get('ENTRY_QUEUE_FLUSH_INTERVAL', 0.5))  # 書き込み間隔（秒）
+    ENTRY_QUEUE_BATCH_SIZE = 500  # この件数に達したら間隔を待たずに書き込む
+    ENTRY_QUEUE_FSYNC = True  # ジャーナル追記ごとにfsyncする
+    ENTRY_QUEUE_MAX_RETRIES = 5  # 書き込みに失敗したセグメントを1件ずつの書き込みに切り替えるまでの回数
+
+    # 入園履歴のリアルタイム配信設定（/api/history/stream）
+    FEED_POLL_INTERVAL = float(os.environ.get('FEED_POLL_INTERVAL', 1.0))  # 他ワーカーの記録を取り込む間隔（秒）
+    FEED_POLL_BATCH_SIZE = 500  # 1回の取り込みで取得する最大件数
+    FEED_HEARTBEAT_INTERVAL = 15  # 接続維持用コメントの送信間隔（秒）
+    FEED_QUEUE_SIZE = 100  # 購読者ごとの未送信イベントの上限（超えた場合は再読み込みを要求）
+
+    # ワーカー間のキャッシュ整合設定
+    CACHE_CHECK_INTERVAL = float(os.environ.get('CACHE_CHECK_INTERVAL', 1.0))  # 他ワーカーの変更を確認する間隔（秒。0で毎リクエスト）
+    DATA_VERSION_CACHE_SECONDS = float(os.environ.get('DATA_VERSION_CACHE_SECONDS', 1.0))  # ETag用のバージョンをプロセス内に保持する秒数
+
+    # 入園履歴のアーカイブ設定（flask history-archive）
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 400))  # この日数より前の月をアーカイブする
+    ARCHIVE_STORAGE = os.environ.get('ARCHIVE_STORAGE', 'table')  # "table"（月別テーブル）または "gzip"（圧縮ファイル）
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR') or os.path.join(BASE_DIR, 'archive')
+
+    # 入園集計設定
+    STATS_AGE_BANDS = [0, 6, 13, 18, 65]  # 年齢層の下限（例: 6～12歳は "6-12"、65歳以上は "65-"）
+
+    # レスポンス圧縮・静的ファイルのキャッシュ設定
+    COMPRESS_MIMETYPES = {
+        'application/json', 'text/html', 'text/css', 'text/plain',
+        'application/javascript', 'text/javascript', 'image/svg+xml'
+    }
+    COMPRESS_MIN_SIZE = 500  # これより小さい応答は圧縮しない（バイト）
+    COMPRESS_LEVEL = 6  # 圧縮レベル（gzip: 1～9）
+    STATIC_MAX_AGE = 365 * 24 * 60 * 60  # ハッシュ付きURLのキャッシュ期間（秒）
+
+    # リクエスト計測設定
+    SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', 0.5))  # これ以上かかったリクエストをSQLとともにログ出力する
+    SLOW_REQUEST_MAX_STATEMENTS = 50  # 遅いリクエストのログに含めるSQLの最大件数
+    METRICS_ALLOWED_ADDRS = {'127.0.0.1', '::1'}  # /metrics へのアクセスを許可する接続元
+    METRICS_DIR = os.environ.get('METRICS_DIR')  # 指定時は各ワーカーの計測値をここに書き出し /metrics で合算する
+    METRICS_DUMP_INTERVAL = 5  # 計測値を書き出す間隔（秒）
+
+    # 再入場判定設定
+    REENTRY_ACROSS_TRANSFERS = os.environ.get('REENTRY_ACROSS_TRANSFERS', 'False').lower() == 'true'  # 振替前後のチケットを同じ来園者として数える
+
+    # 登録なしの番号に対する近似候補設定
+    SUGGEST_MAX_DISTANCE = int(os.environ.get('SUGGEST_MAX_DISTANCE', 1))  # 候補とする編集距離の上限（1～2。0で無効）
+    SUGGEST_MAX_RESULTS = 5  # 返す候補の最大件数
+
+    # 一括操作設定（チケット・入園履歴）
+    BULK_MAX_TKT_NUMBERS = 20000  # tkt_numbers で指定できる最大件数
+    BULK_MAX_LOG_IDS = 20000  # 入園履歴の ids で指定できる最大件数
+    BULK_MAX_EXTEND_DAYS = 3650  # 延長日数の上限（日）
+
+    # 一括入場判定設定
+    BATCH_JUDGE_MAX_SIZE = 500  # 1リクエストあたりの最大スキャン数
+
+    # CSV一括登録設定
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))  # 1トランザクションあたりの行数
+    IMPORT_CHUNK_PAUSE = float(os.environ.get('IMPORT_CHUNK_PAUSE', 0.02))  # チャンク間の待機秒数（入場判定の書き込みを優先させる）
+    IMPORT_PROGRESS_ERRORS = 100  # 処理中に進捗として保存するエラーの最大件数
+
+    # チケット一覧設定
+    TICKETS_PAGE_SIZE = 50  # 1ページあたりの既定件数
+    TICKETS_MAX_PAGE_SIZE = 500  # 1ページあたりの最大件数
+
+    # 履歴一覧設定
+    HISTORY_PAGE_SIZE = 100  # 1ページあたりの既定件数
+    HISTORY_MAX_PAGE_SIZE = 1000  # 1ページあたりの最大件数
+
+    # CSV出力設定
+    EXPORT_BATCH_SIZE = 1000  # データベースから一度に取得する行数
+    EXPORT_FLUSH_SIZE = 64 * 1024  # レスポンスへ書き出すバッファサイズ（文字数）
+
     @staticmethod
     def init_app(app):
         """アプリケーション初期化"""
         # アップロードフォルダが存在しない場合は作成
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+
+
+class ProductionConfig(Config):
+    """本番環境設定（gunicorn複数ワーカーからの同時書き込みを想定）"""
+
+    # WALモードで読み取りと書き込みを並行させ、fsyncはチェックポイント時のみ行う
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000))
+
+    DB_LOCK_RETRIES = 5
+
+    # 接続プール（ワーカーのスレッドごとに接続を再利用）
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': 10,
+        'pool_pre_ping': True
+    }
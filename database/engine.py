@@ -0,0 +1,82 @@
+"""データベースエンジンの設定（SQLiteのPRAGMA・ロック競合時の再試行）"""
+import functools
+import random
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+from database import db
+
+# INSERT ... ON CONFLICT に対応したダイアレクト
+_UPSERT_DIALECTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+
+def configure_engine(app):
+    """SQLite接続ごとにPRAGMAを設定する（アプリケーションコンテキスト内で呼び出す）"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = []
+    if app.config.get('SQLITE_BUSY_TIMEOUT_MS'):
+        pragmas.append(f"PRAGMA busy_timeout = {int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    if app.config.get('SQLITE_JOURNAL_MODE'):
+        pragmas.append(f"PRAGMA journal_mode = {app.config['SQLITE_JOURNAL_MODE']}")
+    if app.config.get('SQLITE_SYNCHRONOUS'):
+        pragmas.append(f"PRAGMA synchronous = {app.config['SQLITE_SYNCHRONOUS']}")
+    if app.config.get('SQLITE_CACHE_SIZE_KB'):
+        # 負の値はKB単位の指定
+        pragmas.append(f"PRAGMA cache_size = -{int(app.config['SQLITE_CACHE_SIZE_KB'])}")
+
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    # 設定前に作成済みの接続を破棄し、以降の接続に適用させる
+    engine.dispose()
+
+
+def upsert(model):
+    """接続先に応じた INSERT 文（on_conflict_do_update を使用できる）を返す"""
+    return _UPSERT_DIALECTS[db.engine.dialect.name](model)
+
+
+def is_lock_error(error):
+    """SQLiteのロック競合エラーかどうか"""
+    message = str(getattr(error, 'orig', error)).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_on_lock(func):
+    """ロック競合で失敗した処理を、ロールバックのうえ指数バックオフで再実行するデコレータ
+
+    再実行されるため、対象の処理はセッションへの追加からコミットまでを関数内で完結させること。
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        retries = current_app.config.get('DB_LOCK_RETRIES', 0)
+        backoff = current_app.config.get('DB_LOCK_RETRY_BACKOFF', 0.05)
+
+        for attempt in range(retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if attempt >= retries or not is_lock_error(e):
+                    raise
+                # 複数ワーカーが同時に再試行しないよう揺らぎを加える
+                time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    return wrapper
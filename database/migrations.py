@@ -0,0 +1,129 @@
+"""スキーママイグレーション
+
+db.create_all() は既存テーブルにインデックス等を追加しないため、
+既存データベースへのスキーマ変更はここにバージョン付きで定義する。
+新規データベースではモデル定義から作成済みのため、各ステップは冪等に記述すること。
+SQLで表せないステップは、接続を受け取る関数としてSQLのリストに含める。
+"""
+from datetime import datetime
+from sqlalchemy import text
+from database import db
+
+
+def _entry_logs_autoincrement(conn):
+    """entry_logs を AUTOINCREMENT 付きで作り直す（SQLiteのみ）
+
+    AUTOINCREMENT が無いと、アーカイブで entry_logs が空になった後に
+    アーカイブ済みの履歴と同じIDが再利用されるため、テーブルを作り直して
+    採番の開始位置をアーカイブ済みの最大IDより後ろに設定する。
+    """
+    if conn.dialect.name != 'sqlite':
+        return
+
+    from models.entry_log import EntryLog
+
+    table_sql = conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'entry_logs'"
+    )).scalar() or ''
+    if 'AUTOINCREMENT' not in table_sql.upper():
+        columns = ', '.join(column.name for column in EntryLog.__table__.columns)
+        conn.execute(text('ALTER TABLE entry_logs RENAME TO entry_logs_old'))
+        for index in EntryLog.__table__.indexes:
+            conn.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+        EntryLog.__table__.create(conn)
+        conn.execute(text(f'INSERT INTO entry_logs ({columns}) SELECT {columns} FROM entry_logs_old'))
+        conn.execute(text('DROP TABLE entry_logs_old'))
+
+    # 採番の開始位置（現在の最大IDとアーカイブ済みの最大IDのうち大きい方）
+    last_id = max(
+        conn.execute(text('SELECT MAX(id) FROM entry_logs')).scalar() or 0,
+        conn.execute(text('SELECT MAX(max_id) FROM entry_log_archives')).scalar() or 0
+    )
+    updated = conn.execute(
+        text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'entry_logs' AND seq < :seq"),
+        {'seq': last_id}
+    ).rowcount
+    exists = conn.execute(text("SELECT 1 FROM sqlite_sequence WHERE name = 'entry_logs'")).scalar()
+    if not updated and not exists and last_id:
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('entry_logs', :seq)"), {'seq': last_id})
+
+
+# (バージョン, 説明, 実行するSQL・関数のリスト)
+MIGRATIONS = [
+    (1, '入園履歴・チケットの検索用インデックスを追加', [
+        'CREATE INDEX IF NOT EXISTS ix_entry_logs_tkt_number_entry_time '
+        'ON entry_logs (tkt_number, entry_time)',
+        'CREATE INDEX IF NOT EXISTS ix_entry_logs_entry_time_id '
+        'ON entry_logs (entry_time, id)',
+        'CREATE INDEX IF NOT EXISTS ix_tickets_created_at '
+        'ON tickets (created_at)',
+    ]),
+    (2, 'チケット一覧の検索用インデックスを追加', [
+        'CREATE INDEX IF NOT EXISTS ix_tickets_expiry_date '
+        'ON tickets (expiry_date)',
+        'CREATE INDEX IF NOT EXISTS ix_tickets_type_gender_expiry '
+        'ON tickets (ticket_type, gender, expiry_date)',
+    ]),
+    (3, '振替の系譜検索用インデックスを追加', [
+        'CREATE INDEX IF NOT EXISTS ix_tickets_previous_tkt_number '
+        'ON tickets (previous_tkt_number)',
+    ]),
+    (4, '入園履歴のIDを再利用しないようにする', [
+        _entry_logs_autoincrement,
+    ]),
+]
+
+
+def _ensure_version_table(conn):
+    """マイグレーション管理テーブルを作成"""
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, '
+        'description TEXT, '
+        'applied_at TIMESTAMP)'
+    ))
+
+
+def current_version():
+    """適用済みの最新バージョンを返す（未適用の場合は0）"""
+    with db.engine.begin() as conn:
+        _ensure_version_table(conn)
+        version = conn.execute(text('SELECT MAX(version) FROM schema_migrations')).scalar()
+    return version or 0
+
+
+def latest_version():
+    """定義済みの最新バージョンを返す"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def upgrade():
+    """未適用のマイグレーションを順に適用する（アプリケーションコンテキスト内で呼び出す）
+
+    Returns:
+        list: 今回適用したバージョンのリスト
+    """
+    applied = []
+    with db.engine.begin() as conn:
+        _ensure_version_table(conn)
+        done = {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+    for version, description, statements in MIGRATIONS:
+        if version in done:
+            continue
+
+        # 1バージョンを1トランザクションで適用
+        with db.engine.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) '
+                     'VALUES (:version, :description, :applied_at)'),
+                {'version': version, 'description': description, 'applied_at': datetime.utcnow()}
+            )
+        applied.append(version)
+
+    return applied
@@ -0,0 +1,44 @@
+"""gunicorn設定（gunicorn -c gunicorn.conf.py wsgi:app で起動）
+
+テーブル作成・マイグレーションはマスタープロセスの起動時に1回だけ行い、
+各ワーカーは wsgi.py の読み込み時にスキーマ処理を省略してウォームアップのみ行う。
+（preload_app を有効にすると on_starting より前に wsgi.py が読み込まれるため、使用しないこと）
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# 履歴管理画面のリアルタイム更新は接続中スレッドを占有するため、スレッドワーカーで起動する
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+
+def on_starting(server):
+    """ワーカー起動前にスキーマを準備"""
+    from boot import prepare_database_once
+    from config import ProductionConfig
+
+    applied = prepare_database_once(ProductionConfig)
+    if applied:
+        server.log.info(f"マイグレーションを適用しました: {', '.join(str(v) for v in applied)}")
+    server.log.info("データベースのスキーマを準備しました")
+
+    # フォークされるワーカーに引き継ぐ
+    os.environ['SCHEMA_PREPARED'] = '1'
+
+    # 以前の起動で残ったワーカーの計測値を削除
+    from instrumentation import remove_snapshots
+    remove_snapshots(ProductionConfig.METRICS_DIR)
+
+
+def post_worker_init(worker):
+    """ワーカーのウォームアップ完了を記録"""
+    worker.log.info(f"ワーカーの準備が完了しました (pid: {worker.pid})")
+
+
+def worker_exit(server, worker):
+    """終了したワーカーの計測値を削除（/metrics の合算から外す）"""
+    from instrumentation import remove_snapshots
+    from config import ProductionConfig
+
+    remove_snapshots(ProductionConfig.METRICS_DIR, worker.pid)
@@ -0,0 +1,282 @@
+"""リクエスト計測（レイテンシ・SQL実行回数と時間・遅いリクエストのログ）
+
+- エンドポイントごとのレイテンシとSQL実行回数をヒストグラムで集計する
+- SQLの実行回数・時間は SQLAlchemy のエンジンイベントでリクエスト単位に記録する
+- SLOW_REQUEST_SECONDS を超えたリクエストは、実行したSQLとその時間をログに出力する
+- 応答には Server-Timing ヘッダを付け、ブラウザの開発者ツールで内訳を確認できるようにする
+- /metrics でPrometheusのテキスト形式を返す（METRICS_ALLOWED_ADDRS からのアクセスのみ）
+
+gunicornの複数ワーカーで集計をまとめる場合は METRICS_DIR を指定する。
+各ワーカーが定期的に集計をファイルへ書き出し、/metrics は稼働中のワーカー分を合算して返す。
+終了したワーカーのファイルは合算せずに削除する（gunicorn.conf.py でも起動時・ワーカー終了時に削除する）。
+"""
+import glob
+import json
+import os
+import threading
+import time
+from flask import g, request, has_request_context, current_app
+from sqlalchemy import event
+
+# レイテンシのヒストグラム境界（秒）
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+# リクエストあたりのSQL実行回数のヒストグラム境界
+QUERY_COUNT_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100]
+
+
+class Metrics:
+    """プロセス内の計測値"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}  # (endpoint, method, status) → 件数
+        self.latency = {}  # (endpoint, method) → {'buckets': [...], 'sum': 秒, 'count': 件数}
+        self.queries = {}  # (endpoint, method) → {'buckets': [...], 'sum': 回数, 'count': 件数}
+        self.query_seconds = {}  # (endpoint, method) → SQL実行時間の合計（秒）
+        self.slow_requests = {}  # (endpoint, method) → 件数
+        self._last_dump = 0.0
+
+    @staticmethod
+    def _observe(histograms, key, bounds, value):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = {'buckets': [0] * len(bounds), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                histogram['buckets'][i] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+    def observe(self, endpoint, method, status, seconds, query_count, query_seconds, slow):
+        """1リクエスト分を記録"""
+        key = (endpoint, method)
+        with self._lock:
+            status_key = (endpoint, method, status)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            self._observe(self.latency, key, LATENCY_BUCKETS, seconds)
+            self._observe(self.queries, key, QUERY_COUNT_BUCKETS, query_count)
+            self.query_seconds[key] = self.query_seconds.get(key, 0.0) + query_seconds
+            if slow:
+                self.slow_requests[key] = self.slow_requests.get(key, 0) + 1
+
+    def snapshot(self):
+        """JSONに変換できる形式の計測値"""
+        with self._lock:
+            return {
+                'requests': [[*key, value] for key, value in self.requests.items()],
+                'latency': [[*key, value] for key, value in self.latency.items()],
+                'queries': [[*key, value] for key, value in self.queries.items()],
+                'query_seconds': [[*key, value] for key, value in self.query_seconds.items()],
+                'slow_requests': [[*key, value] for key, value in self.slow_requests.items()]
+            }
+
+    def dump(self, directory, interval):
+        """ワーカーごとの集計ファイルを書き出す（interval 秒に1回まで）"""
+        now = time.monotonic()
+        if now - self._last_dump < interval:
+            return
+        self._last_dump = now
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as snapshot_file:
+            json.dump(self.snapshot(), snapshot_file)
+        os.replace(temp_path, path)
+
+
+def _snapshot_pid(path):
+    """集計ファイル名からワーカーのPIDを取り出す（不正な場合はNone）"""
+    name = os.path.basename(path)[len('metrics-'):-len('.json')]
+    return int(name) if name.isdigit() else None
+
+
+def _pid_alive(pid):
+    """プロセスが稼働中か"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 別ユーザーのプロセスとして存在する
+        return True
+    return True
+
+
+def remove_snapshots(directory, pid=None):
+    """ワーカーの集計ファイルを削除（pid 省略時は全ワーカー分）"""
+    if not directory:
+        return
+    pattern = f'metrics-{pid}.json' if pid is not None else 'metrics-*.json'
+    for path in glob.glob(os.path.join(directory, pattern)):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+
+
+def _merge(snapshots):
+    """複数ワーカーの計測値を合算"""
+    merged = {'requests': {}, 'latency': {}, 'queries': {}, 'query_seconds': {}, 'slow_requests': {}}
+    for snapshot in snapshots:
+        for name in ('requests', 'query_seconds', 'slow_requests'):
+            for *key, value in snapshot[name]:
+                key = tuple(key)
+                merged[name][key] = merged[name].get(key, 0) + value
+        for name in ('latency', 'queries'):
+            for *key, value in snapshot[name]:
+                key = tuple(key)
+                total = merged[name].get(key)
+                if total is None:
+                    merged[name][key] = {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+                else:
+                    total['buckets'] = [a + b for a, b in zip(total['buckets'], value['buckets'])]
+                    total['sum'] += value['sum']
+                    total['count'] += value['count']
+    return merged
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_histogram(lines, name, help_text, histograms, bounds):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for (endpoint, method), histogram in sorted(histograms.items()):
+        labels = f'endpoint="{_label(endpoint)}",method="{method}"'
+        for bound, count in zip(bounds, histogram['buckets']):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+        lines.append(f'{name}_sum{{{labels}}} {histogram["sum"]}')
+        lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+
+
+def format_prometheus(merged):
+    """Prometheusのテキスト形式に変換"""
+    lines = [
+        '# HELP http_requests_total 処理したリクエスト数',
+        '# TYPE http_requests_total counter'
+    ]
+    for (endpoint, method, status), value in sorted(merged['requests'].items()):
+        lines.append(f'http_requests_total{{endpoint="{_label(endpoint)}",method="{method}",status="{status}"}} {value}')
+
+    _format_histogram(lines, 'http_request_duration_seconds', 'リクエストの処理時間（秒）',
+                      merged['latency'], LATENCY_BUCKETS)
+    _format_histogram(lines, 'db_queries_per_request', 'リクエストあたりのSQL実行回数',
+                      merged['queries'], QUERY_COUNT_BUCKETS)
+
+    lines.append('# HELP db_query_seconds_total SQLの実行時間の合計（秒）')
+    lines.append('# TYPE db_query_seconds_total counter')
+    for (endpoint, method), value in sorted(merged['query_seconds'].items()):
+        lines.append(f'db_query_seconds_total{{endpoint="{_label(endpoint)}",method="{method}"}} {value}')
+
+    lines.append('# HELP http_slow_requests_total SLOW_REQUEST_SECONDS を超えたリクエスト数')
+    lines.append('# TYPE http_slow_requests_total counter')
+    for (endpoint, method), value in sorted(merged['slow_requests'].items()):
+        lines.append(f'http_slow_requests_total{{endpoint="{_label(endpoint)}",method="{method}"}} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+# アプリケーション全体で共有する計測値
+metrics = Metrics()
+
+
+def register_instrumentation(app):
+    """リクエスト計測と /metrics を登録（アプリケーションコンテキスト内で呼び出す）"""
+    from database import db
+
+    slow_seconds = app.config['SLOW_REQUEST_SECONDS']
+    max_statements = app.config['SLOW_REQUEST_MAX_STATEMENTS']
+    metrics_dir = app.config.get('METRICS_DIR')
+    dump_interval = app.config['METRICS_DUMP_INTERVAL']
+
+    @event.listens_for(db.engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'sql_count' in g:
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(db.engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('query_started')
+        if not started or not has_request_context() or 'sql_count' not in g:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        g.sql_count += 1
+        g.sql_seconds += elapsed
+        if len(g.sql_statements) < max_statements:
+            g.sql_statements.append((elapsed, statement))
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+        g.sql_statements = []
+
+    @app.after_request
+    def record_request(response):
+        if 'request_started' not in g:
+            return response
+
+        elapsed = time.perf_counter() - g.request_started
+        endpoint = request.endpoint or 'unknown'
+        slow = elapsed >= slow_seconds
+
+        metrics.observe(endpoint, request.method, response.status_code, elapsed,
+                        g.sql_count, g.sql_seconds, slow)
+
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, '
+            f'db;dur={g.sql_seconds * 1000:.1f};desc="{g.sql_count} queries"'
+        )
+
+        if slow:
+            statements = '\n'.join(
+                f'  {seconds * 1000:.1f}ms {" ".join(statement.split())[:500]}'
+                for seconds, statement in sorted(g.sql_statements, reverse=True)
+            )
+            path = request.full_path if request.query_string else request.path
+            app.logger.warning(
+                f'遅いリクエスト: {request.method} {path} {elapsed * 1000:.1f}ms '
+                f'(SQL {g.sql_count}回 {g.sql_seconds * 1000:.1f}ms)\n{statements}'
+            )
+
+        if metrics_dir:
+            try:
+                metrics.dump(metrics_dir, dump_interval)
+            except OSError as e:
+                app.logger.error(f'計測値の書き出しに失敗しました: {e}')
+
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        """計測値（Prometheusテキスト形式）"""
+        if request.remote_addr not in current_app.config['METRICS_ALLOWED_ADDRS']:
+            return current_app.response_class('Not Found', status=404, mimetype='text/plain')
+
+        snapshots = [metrics.snapshot()]
+        if metrics_dir:
+            own = os.path.join(metrics_dir, f'metrics-{os.getpid()}.json')
+            for path in glob.glob(os.path.join(metrics_dir, 'metrics-*.json')):
+                if path == own:
+                    continue
+                pid = _snapshot_pid(path)
+                if pid is None:
+                    continue
+                if not _pid_alive(pid):
+                    # 終了したワーカー（再起動・max_requests による入れ替え・以前のデプロイ）の集計は合算しない
+                    remove_snapshots(metrics_dir, pid)
+                    continue
+                try:
+                    with open(path, encoding='utf-8') as snapshot_file:
+                        snapshots.append(json.load(snapshot_file))
+                except (OSError, ValueError):
+                    continue
+
+        return current_app.response_class(
+            format_prometheus(_merge(snapshots)),
+            mimetype='text/plain; version=0.0.4'
+        )
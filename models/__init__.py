@@ -1,4 +1,8 @@
 from .ticket import Ticket
 from .entry_log import EntryLog
+from .import_job import ImportJob
+from .attendance_stat import AttendanceStat
+from .entry_log_archive import EntryLogArchive
+from .data_version import DataVersion
 
-__all__ = ['Ticket', 'EntryLog']
+__all__ = ['Ticket', 'EntryLog', 'ImportJob', 'AttendanceStat', 'EntryLogArchive', 'DataVersion']
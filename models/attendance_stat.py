@@ -0,0 +1,37 @@
+from database import db
+
+class AttendanceStat(db.Model):
+    """入園集計モデル（日付・時間帯・券種・性別・年齢層・判定結果・再入場ごとの件数）"""
+
+    __tablename__ = 'attendance_stats'
+    __table_args__ = (
+        # 集計キー（入園記録時の加算に使用。先頭の日付で期間検索も行う）
+        db.UniqueConstraint('stat_date', 'hour', 'ticket_type', 'gender', 'age_band', 'result', 'is_reentry',
+                            name='uq_attendance_stats_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    stat_date = db.Column(db.Date, nullable=False)
+    hour = db.Column(db.Integer, nullable=False)  # 0～23
+    ticket_type = db.Column(db.String(10), nullable=False, default='')  # 未登録のTKT番号は空文字
+    gender = db.Column(db.String(10), nullable=False, default='')
+    age_band = db.Column(db.String(10), nullable=False, default='')  # 例: "18-64"
+    result = db.Column(db.String(5), nullable=False)  # "OK", "NG"
+    is_reentry = db.Column(db.Boolean, nullable=False, default=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        """辞書形式に変換"""
+        return {
+            'stat_date': self.stat_date.isoformat() if self.stat_date else None,
+            'hour': self.hour,
+            'ticket_type': self.ticket_type,
+            'gender': self.gender,
+            'age_band': self.age_band,
+            'result': self.result,
+            'is_reentry': self.is_reentry,
+            'count': self.count
+        }
+
+    def __repr__(self):
+        return f'<AttendanceStat {self.stat_date} {self.hour}時: {self.count}>'
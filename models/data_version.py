@@ -0,0 +1,22 @@
+from datetime import datetime
+from database import db
+
+class DataVersion(db.Model):
+    """データ種別ごとの更新バージョン（HTTPキャッシュの検証子・ワーカー間のキャッシュ無効化に使用）"""
+
+    __tablename__ = 'data_versions'
+
+    name = db.Column(db.String(50), primary_key=True)  # "tickets", "entry_logs"
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        """辞書形式に変換"""
+        return {
+            'name': self.name,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<DataVersion {self.name}: {self.version}>'
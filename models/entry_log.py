@@ -5,6 +5,14 @@ class EntryLog(db.Model):
     """入園履歴モデル"""
 
     __tablename__ = 'entry_logs'
+    __table_args__ = (
+        # TKT番号ごとの履歴検索・当日入場回数の集計用
+        db.Index('ix_entry_logs_tkt_number_entry_time', 'tkt_number', 'entry_time'),
+        # 入園時間順の一覧・エクスポート用
+        db.Index('ix_entry_logs_entry_time_id', 'entry_time', 'id'),
+        # アーカイブで entry_logs が空になってもIDを再利用しない（アーカイブ済みの履歴とIDが重複しないようにする）
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     tkt_number = db.Column(db.String(10), db.ForeignKey('tickets.tkt_number'), nullable=False)
@@ -0,0 +1,36 @@
+from datetime import datetime
+from database import db
+
+class EntryLogArchive(db.Model):
+    """入園履歴アーカイブ管理モデル（月単位のアーカイブ先と範囲）"""
+
+    __tablename__ = 'entry_log_archives'
+
+    month = db.Column(db.String(7), primary_key=True)  # "YYYY-MM"
+    storage = db.Column(db.String(10), nullable=False)  # "table"（月別テーブル）, "gzip"（圧縮ファイル）
+    location = db.Column(db.String(255), nullable=False)  # テーブル名またはファイルパス
+    period_start = db.Column(db.Date, nullable=False)  # 対象期間の開始日
+    period_end = db.Column(db.Date, nullable=False)  # 対象期間の終了日の翌日
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    min_id = db.Column(db.Integer, nullable=True)
+    max_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """辞書形式に変換"""
+        return {
+            'month': self.month,
+            'storage': self.storage,
+            'location': self.location,
+            'period_start': self.period_start.isoformat() if self.period_start else None,
+            'period_end': self.period_end.isoformat() if self.period_end else None,
+            'row_count': self.row_count,
+            'min_id': self.min_id,
+            'max_id': self.max_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<EntryLogArchive {self.month}: {self.row_count}件>'
@@ -0,0 +1,43 @@
+import json
+from datetime import datetime
+from database import db
+
+class ImportJob(db.Model):
+    """CSV一括登録ジョブモデル"""
+
+    __tablename__ = 'import_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    filename = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(10), nullable=False, default='queued')  # "queued", "running", "completed", "failed"
+    total_rows = db.Column(db.Integer, default=0)
+    success_count = db.Column(db.Integer, default=0)
+    error_count = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Text, nullable=True)  # JSON配列
+    elapsed_seconds = db.Column(db.Float, default=0.0)
+    rows_per_second = db.Column(db.Float, default=0.0)
+    message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        """辞書形式に変換"""
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'total_rows': self.total_rows,
+            'success_count': self.success_count,
+            'error_count': self.error_count,
+            'errors': json.loads(self.errors) if self.errors else [],
+            'elapsed_seconds': self.elapsed_seconds,
+            'rows_per_second': self.rows_per_second,
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<ImportJob {self.id}: {self.status}>'
@@ -5,6 +5,15 @@ class Ticket(db.Model):
     """年間パスポート情報モデル"""
 
     __tablename__ = 'tickets'
+    __table_args__ = (
+        # 登録日時順の一覧・エクスポート用
+        db.Index('ix_tickets_created_at', 'created_at'),
+        # 一覧の検索（券種・性別・有効期限）用
+        db.Index('ix_tickets_expiry_date', 'expiry_date'),
+        db.Index('ix_tickets_type_gender_expiry', 'ticket_type', 'gender', 'expiry_date'),
+        # 振替の系譜（後継チケットの検索）用
+        db.Index('ix_tickets_previous_tkt_number', 'previous_tkt_number'),
+    )
 
     tkt_number = db.Column(db.String(10), primary_key=True)
     age = db.Column(db.Integer, nullable=False)
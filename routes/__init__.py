@@ -4,6 +4,6 @@ from flask import Blueprint
 api = Blueprint('api', __name__, url_prefix='/api')
 
 # 各ルートのインポート
-from . import entry, ticket, history, export_data
+from . import entry, ticket, history, export_data, stats
 
 __all__ = ['api']
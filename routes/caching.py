@@ -0,0 +1,68 @@
+"""読み取りAPIの条件付きGET（ETag / Last-Modified）"""
+import functools
+import hashlib
+from datetime import timezone
+from flask import request, make_response, current_app
+from sqlalchemy import func
+from models.entry_log import EntryLog
+from database import db
+from services.data_versions import DataVersionService
+
+
+def latest_log_id():
+    """最新の入園履歴ID（記録のたびにはバージョンを進めないため、履歴を返すAPIのETagに含める）"""
+    return db.session.query(func.max(EntryLog.id)).scalar() or 0
+
+
+def conditional_get(*names, watermark=None):
+    """
+    データ種別のバージョンから弱いETagを作成し、変更がなければビューを実行せずに 304 を返すデコレータ
+
+    ETagはバージョンとURL（パス・クエリ）から作るため、ページや検索条件ごとに別の値になる。
+    弱いETagのため、圧縮の有無にかかわらず同じ検証子を使用できる。
+
+    Args:
+        names: 応答内容が依存するデータ種別
+        watermark: 追加でETagに含める値を返す関数（バージョンを進めない追加操作の検出用。指定時は Last-Modified を使用しない）
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                versions = [DataVersionService.get(name) for name in names]
+                parts = [str(version) for version, _ in versions]
+                if watermark:
+                    parts.append(str(watermark()))
+            except Exception:
+                # 検証子を作成できない場合は通常どおり応答する
+                return view(*args, **kwargs)
+
+            parts.append(hashlib.sha1(request.full_path.encode('utf-8')).hexdigest()[:12])
+            etag = '-'.join(parts)
+
+            # 追加値を含む場合は更新日時だけでは変更を判定できないため、Last-Modified は使用しない
+            updated = [updated_at for _, updated_at in versions if updated_at] if not watermark else []
+            last_modified = max(updated).replace(tzinfo=timezone.utc, microsecond=0) if updated else None
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = bool(since and last_modified and last_modified <= since)
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            # キャッシュは保持してよいが、使用前に毎回検証させる
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        return wrapper
+    return decorator
@@ -1,7 +1,16 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
+from datetime import datetime
 from . import api
 from services.entry_judgement import EntryJudgementService
+from services.judgement_response import compact_judgement_serializer, COMPACT_MEDIA_TYPE
 from services.validation import ValidationService
+from database import db
+
+def _wants_compact():
+    """コンパクトレスポンスが要求されているか（?compact=1 または Acceptヘッダで指定）"""
+    if request.args.get('compact', '').lower() in ('1', 'true'):
+        return True
+    return COMPACT_MEDIA_TYPE in request.headers.get('Accept', '')
 
 @api.route('/entry/judge', methods=['POST'])
 def judge_entry():
@@ -15,8 +24,10 @@ def judge_entry():
         if not valid:
             return jsonify({'error': msg}), 400
 
+        compact = _wants_compact()
+
         # 入場判定実行
-        result = EntryJudgementService.judge(tkt_number)
+        result = EntryJudgementService.judge(tkt_number, ticket_dict=not compact)
 
         # 履歴記録（再入場フラグを判定結果から取得）
         entry_log = EntryJudgementService.record_entry(
@@ -26,6 +37,11 @@ def judge_entry():
             is_reentry=result.get('is_reentry', False)
         )
 
+        # コンパクトレスポンス（ゲート画面の表示項目のみ）
+        if compact:
+            body = compact_judgement_serializer.serialize(tkt_number, result, entry_log.entry_time)
+            return current_app.response_class(body, status=200, mimetype='application/json')
+
         # レスポンス
         response = {
             'success': True,
@@ -37,3 +53,68 @@ def judge_entry():
 
     except Exception as e:
         return jsonify({'error': f'判定処理でエラーが発生しました: {str(e)}'}), 500
+
+@api.route('/entry/judge/batch', methods=['POST'])
+def judge_entry_batch():
+    """一括入場判定API（オフライン端末の再接続時に蓄積スキャンを送信）"""
+    try:
+        data = request.get_json() or {}
+        scans = data.get('scans')
+        if not isinstance(scans, list) or not scans:
+            return jsonify({'error': 'scans にスキャンの配列を指定してください'}), 400
+
+        max_size = current_app.config['BATCH_JUDGE_MAX_SIZE']
+        if len(scans) > max_size:
+            return jsonify({'error': f'一度に送信できるスキャンは{max_size}件までです'}), 400
+
+        # バリデーション（不正なスキャンは判定・記録せずにエラーとして返す）
+        valid_scans = []
+        errors = {}
+        for index, scan in enumerate(scans):
+            scan = scan if isinstance(scan, dict) else {}
+            tkt_number = str(scan.get('tkt_number') or '').strip()
+
+            valid, msg = ValidationService.validate_tkt_number(tkt_number)
+            if not valid:
+                errors[index] = msg
+                continue
+
+            try:
+                entry_time = datetime.fromisoformat(scan['entry_time'])
+            except (KeyError, TypeError, ValueError):
+                errors[index] = 'entry_time はISO 8601形式で指定してください'
+                continue
+
+            # タイムゾーン付きの場合はサーバのローカル時刻に変換
+            if entry_time.tzinfo is not None:
+                entry_time = entry_time.astimezone().replace(tzinfo=None)
+
+            valid_scans.append({'index': index, 'tkt_number': tkt_number, 'entry_time': entry_time})
+
+        # 一括判定・記録
+        judged = EntryJudgementService.judge_batch(valid_scans)
+
+        results = [None] * len(scans)
+        for index, msg in errors.items():
+            results[index] = {'index': index, 'success': False, 'error': msg}
+        for scan, (judgement, entry_log) in zip(valid_scans, judged):
+            results[scan['index']] = {
+                'index': scan['index'],
+                'success': True,
+                'judgement': judgement,
+                'entry_log': entry_log.to_dict()
+            }
+
+        ok_count = sum(1 for judgement, _ in judged if judgement['result'] == 'OK')
+
+        return jsonify({
+            'success': True,
+            'results': results,
+            'ok_count': ok_count,
+            'ng_count': len(judged) - ok_count,
+            'error_count': len(errors)
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'一括判定処理でエラーが発生しました: {str(e)}'}), 500
@@ -1,65 +1,112 @@
-from flask import jsonify, make_response
+from flask import request, jsonify, Response, stream_with_context, current_app
 from datetime import datetime
 from . import api
 from models.entry_log import EntryLog
+from models.ticket import Ticket
+from services.history_query import HistoryQueryService
+from services.history_archive import HistoryArchiveService
+from services.ticket_query import TicketQueryService
 import csv
+import heapq
 import io
 
+def _stream_csv(header, rows, format_row):
+    """行をバッチ単位で取得しながらCSVを逐次出力するジェネレータ"""
+    flush_size = current_app.config.get('EXPORT_FLUSH_SIZE', 64 * 1024)
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(format_row(row))
+        if output.tell() >= flush_size:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+
+    yield output.getvalue()
+
+def _csv_response(generator, filename_prefix):
+    """ストリーミングCSVレスポンスを作成"""
+    response = Response(stream_with_context(generator), mimetype='text/csv')
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8-sig'
+    response.headers['Content-Disposition'] = f'attachment; filename={filename_prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    return response
+
 @api.route('/export/history', methods=['GET'])
 def export_history():
-    """入園履歴CSV出力API"""
+    """入園履歴CSV出力API（date_from, date_to, tkt_number, result, is_reentry で絞り込み可能）"""
     try:
-        # 全履歴を取得
-        logs = EntryLog.query.order_by(EntryLog.entry_time.desc()).all()
+        filters, error = HistoryQueryService.parse_filters(request.args)
+        if error:
+            return jsonify({'error': error}), 400
 
-        # CSV生成
-        output = io.StringIO()
-        writer = csv.writer(output)
+        # 必要な列のみをサーバ側でバッチ取得
+        query = EntryLog.query.with_entities(
+            EntryLog.id,
+            EntryLog.tkt_number,
+            EntryLog.entry_time,
+            EntryLog.result,
+            EntryLog.comment,
+            EntryLog.is_reentry
+        )
+        query = HistoryQueryService.apply_filters(query, filters)
+        query = query.order_by(EntryLog.entry_time.desc(), EntryLog.id.desc())
+        rows = query.yield_per(current_app.config.get('EXPORT_BATCH_SIZE', 1000))
 
-        # ヘッダー
-        writer.writerow(['ID', 'TKT番号', '入園時間', '判定結果', 'コメント', '再入場'])
+        # 期間がアーカイブ済みの月に及ぶ場合は月ごとの出力と入園時間順に併合
+        archives = HistoryArchiveService.archives_for(filters)
+        if archives:
+            rows = heapq.merge(
+                rows,
+                *[HistoryArchiveService.iter_rows(record, filters) for record in archives],
+                key=lambda log: (log.entry_time, log.id),
+                reverse=True
+            )
 
-        # データ行
-        for log in logs:
-            writer.writerow([
+        header = ['ID', 'TKT番号', '入園時間', '判定結果', 'コメント', '再入場']
+
+        def format_row(log):
+            return [
                 log.id,
                 log.tkt_number,
                 log.entry_time.strftime('%Y/%m/%d %H:%M:%S') if log.entry_time else '',
                 log.result,
                 log.comment or '',
                 '○' if log.is_reentry else ''
-            ])
-
-        # レスポンス作成
-        output.seek(0)
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8-sig'
-        response.headers['Content-Disposition'] = f'attachment; filename=entry_history_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+            ]
 
-        return response
+        return _csv_response(_stream_csv(header, rows, format_row), 'entry_history')
 
     except Exception as e:
         return jsonify({'error': f'エクスポートエラー: {str(e)}'}), 500
 
 @api.route('/export/tickets', methods=['GET'])
 def export_tickets():
-    """チケット情報CSV出力API"""
+    """チケット情報CSV出力API（tkt_number, ticket_type, gender, expiry_from, expiry_to で絞り込み可能）"""
     try:
-        from models.ticket import Ticket
+        filters, error = TicketQueryService.parse_filters(request.args)
+        if error:
+            return jsonify({'error': error}), 400
 
-        # 全チケットを取得
-        tickets = Ticket.query.order_by(Ticket.created_at.desc()).all()
+        # 必要な列のみをサーバ側でバッチ取得
+        query = Ticket.query.with_entities(
+            Ticket.tkt_number,
+            Ticket.age,
+            Ticket.gender,
+            Ticket.ticket_type,
+            Ticket.start_date,
+            Ticket.expiry_date,
+            Ticket.remarks
+        )
+        query = TicketQueryService.apply_filters(query, filters)
+        query = query.order_by(Ticket.created_at.desc())
+        rows = query.yield_per(current_app.config.get('EXPORT_BATCH_SIZE', 1000))
 
-        # CSV生成
-        output = io.StringIO()
-        writer = csv.writer(output)
+        header = ['TKT番号', '年齢', '性別', '券種', '使用開始日', '有効期限', '備考']
 
-        # ヘッダー
-        writer.writerow(['TKT番号', '年齢', '性別', '券種', '使用開始日', '有効期限', '備考'])
-
-        # データ行
-        for ticket in tickets:
-            writer.writerow([
+        def format_row(ticket):
+            return [
                 ticket.tkt_number,
                 ticket.age,
                 ticket.gender,
@@ -67,15 +114,9 @@ def export_tickets():
                 ticket.start_date.strftime('%Y/%m/%d') if ticket.start_date else '',
                 ticket.expiry_date.strftime('%Y/%m/%d') if ticket.expiry_date else '',
                 ticket.remarks or ''
-            ])
-
-        # レスポンス作成
-        output.seek(0)
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8-sig'
-        response.headers['Content-Disposition'] = f'attachment; filename=tickets_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+            ]
 
-        return response
+        return _csv_response(_stream_csv(header, rows, format_row), 'tickets')
 
     except Exception as e:
         return jsonify({'error': f'エクスポートエラー: {str(e)}'}), 500
@@ -1,45 +1,142 @@
-from flask import request, jsonify
+import json
+import queue
+from flask import request, jsonify, current_app, Response, stream_with_context
 from datetime import datetime
 from . import api
 from models.entry_log import EntryLog
 from database import db
+from database.engine import retry_on_lock
+from services.entry_counter import today_entry_counter
+from services.history_query import HistoryQueryService
+from services.entry_feed import entry_feed
+from services.attendance_stats import AttendanceStatsService
+from services.history_archive import HistoryArchiveService
+from services.history_bulk import HistoryBulkService
+from services.data_versions import DataVersionService, ENTRY_LOGS
+from .caching import conditional_get, latest_log_id
+
+def history_page(filters):
+    """
+    検索条件に一致する入園履歴の1ページ分（入園時間・IDの降順、キーセット方式のページング）
+
+    limit・cursor はクエリパラメータから取得し、アーカイブ済みの月に及ぶ場合はアーカイブ分と合わせて並べ替える。
+
+    Returns:
+        tuple: (レスポンスの辞書, エラーメッセージ or None)
+    """
+    limit = request.args.get('limit', type=int) or current_app.config['HISTORY_PAGE_SIZE']
+    limit = max(1, min(limit, current_app.config['HISTORY_MAX_PAGE_SIZE']))
+
+    query = HistoryQueryService.apply_filters(EntryLog.query, filters)
+
+    # 前ページ末尾の続きから取得
+    cursor = None
+    cursor_param = request.args.get('cursor')
+    if cursor_param:
+        cursor = HistoryQueryService.decode_cursor(cursor_param)
+        if not cursor:
+            return None, 'cursor が不正です'
+        query = HistoryQueryService.apply_cursor(query, cursor)
+
+    # 新しい順にソートし、次ページの有無を判定するため1件多く取得
+    query = query.order_by(EntryLog.entry_time.desc(), EntryLog.id.desc())
+    logs = query.limit(limit + 1).all()
+
+    # 期間がアーカイブ済みの月に及ぶ場合はアーカイブ分と合わせて並べ替え
+    archived = HistoryArchiveService.fetch_page(filters, cursor, limit + 1)
+    if archived:
+        logs = sorted(logs + archived, key=lambda log: (log.entry_time, log.id), reverse=True)[:limit + 1]
+
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    next_cursor = None
+    if has_more:
+        next_cursor = HistoryQueryService.encode_cursor(logs[-1].entry_time, logs[-1].id)
+
+    return {
+        'logs': [log.to_dict() for log in logs],
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    }, None
 
 @api.route('/history', methods=['GET'])
+@conditional_get(ENTRY_LOGS, watermark=latest_log_id)
 def get_history():
-    """入園履歴一覧取得API"""
+    """入園履歴一覧取得API（入園時間・IDの降順、キーセット方式のページング）"""
     try:
         # クエリパラメータ取得
-        tkt_number = request.args.get('tkt_number')
-        limit = request.args.get('limit', type=int)
+        filters, error = HistoryQueryService.parse_filters(request.args)
+        if error:
+            return jsonify({'error': error}), 400
 
-        query = EntryLog.query
+        page, error = history_page(filters)
+        if error:
+            return jsonify({'error': error}), 400
 
-        # TKT番号でフィルタ
-        if tkt_number:
-            query = query.filter_by(tkt_number=tkt_number)
+        return jsonify({'success': True, **page}), 200
 
-        # 新しい順にソート
-        query = query.order_by(EntryLog.entry_time.desc())
+    except Exception as e:
+        return jsonify({'error': f'履歴取得エラー: {str(e)}'}), 500
 
-        # 件数制限
-        if limit:
-            query = query.limit(limit)
+def _sse(event, data):
+    """Server-Sent Events の1メッセージ"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-        logs = query.all()
+@api.route('/history/stream', methods=['GET'])
+def stream_history():
+    """入園履歴のリアルタイム配信API（Server-Sent Events）"""
+    try:
+        app = current_app._get_current_object()
+        heartbeat = app.config['FEED_HEARTBEAT_INTERVAL']
+        subscriber, stats = entry_feed.subscribe(app)
+
+        def generate():
+            try:
+                yield 'retry: 3000\n\n'
+                if stats['date']:
+                    yield _sse('stats', stats)
+                while True:
+                    try:
+                        event = subscriber.get(timeout=heartbeat)
+                    except queue.Empty:
+                        # 接続維持用のコメント行
+                        yield ': keepalive\n\n'
+                        continue
+                    event_type = event.pop('type')
+                    yield _sse(event_type, event)
+            finally:
+                entry_feed.unsubscribe(subscriber)
+
+        response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
 
-        return jsonify({
-            'success': True,
-            'logs': [log.to_dict() for log in logs]
-        }), 200
+    except Exception as e:
+        return jsonify({'error': f'履歴配信エラー: {str(e)}'}), 500
+
+@api.route('/history/bulk', methods=['POST'])
+def bulk_history():
+    """入園履歴一括操作API（判定結果・再入場フラグ・コメントの訂正、削除）"""
+    try:
+        params, error = HistoryBulkService.parse_request(request.get_json(silent=True))
+        if error:
+            return jsonify({'error': error}), 400
+
+        result = HistoryBulkService.execute(params)
+
+        return jsonify({'success': True, **result}), 200
 
     except Exception as e:
-        return jsonify({'error': f'履歴取得エラー: {str(e)}'}), 500
+        db.session.rollback()
+        return jsonify({'error': f'履歴一括操作エラー: {str(e)}'}), 500
 
 @api.route('/history/<int:log_id>', methods=['GET'])
+@conditional_get(ENTRY_LOGS)
 def get_history_detail(log_id):
     """入園履歴詳細取得API"""
     try:
-        log = EntryLog.query.get(log_id)
+        log = EntryLog.query.get(log_id) or HistoryArchiveService.get(log_id)
         if not log:
             return jsonify({'error': '履歴が見つかりません'}), 404
 
@@ -55,23 +152,42 @@ def get_history_detail(log_id):
 def update_history(log_id):
     """入園履歴更新API"""
     try:
-        log = EntryLog.query.get(log_id)
-        if not log:
-            return jsonify({'error': '履歴が見つかりません'}), 404
-
         data = request.get_json()
 
-        # 更新可能なフィールドのみ更新
-        if 'entry_time' in data:
-            log.entry_time = datetime.fromisoformat(data['entry_time'])
-        if 'result' in data:
-            log.result = data['result']
-        if 'comment' in data:
-            log.comment = data['comment']
-        if 'is_reentry' in data:
-            log.is_reentry = data['is_reentry']
+        @retry_on_lock
+        def apply_update():
+            log = EntryLog.query.get(log_id)
+            if not log:
+                return None, None
+
+            previous = (log.tkt_number, log.entry_time, log.result)
+
+            # 更新可能なフィールドのみ更新
+            if 'entry_time' in data:
+                log.entry_time = datetime.fromisoformat(data['entry_time'])
+            if 'result' in data:
+                log.result = data['result']
+            if 'comment' in data:
+                log.comment = data['comment']
+            if 'is_reentry' in data:
+                log.is_reentry = data['is_reentry']
+
+            # 変更前後の日付の集計を作り直す（記録時と分類が変わっていても件数がずれない）
+            AttendanceStatsService.rebuild(dates={previous[1].date(), log.entry_time.date()}, commit=False)
+            DataVersionService.bump(ENTRY_LOGS)
+            db.session.commit()
+            return log, previous
+
+        log, previous = apply_update()
+        if not log:
+            if HistoryArchiveService.get(log_id):
+                return jsonify({'error': 'アーカイブ済みの履歴は編集できません'}), 409
+            return jsonify({'error': '履歴が見つかりません'}), 404
 
-        db.session.commit()
+        # 当日入場カウンタに変更を反映
+        today_entry_counter.discard(*previous)
+        today_entry_counter.add(log.tkt_number, log.entry_time, log.result)
+        entry_feed.invalidate()
 
         return jsonify({
             'success': True,
@@ -87,12 +203,29 @@ def update_history(log_id):
 def delete_history(log_id):
     """入園履歴削除API"""
     try:
-        log = EntryLog.query.get(log_id)
-        if not log:
+        @retry_on_lock
+        def apply_delete():
+            log = EntryLog.query.get(log_id)
+            if not log:
+                return None
+
+            previous = (log.tkt_number, log.entry_time, log.result)
+
+            db.session.delete(log)
+            db.session.flush()
+            AttendanceStatsService.rebuild(dates={log.entry_time.date()}, commit=False)
+            DataVersionService.bump(ENTRY_LOGS)
+            db.session.commit()
+            return previous
+
+        previous = apply_delete()
+        if not previous:
+            if HistoryArchiveService.get(log_id):
+                return jsonify({'error': 'アーカイブ済みの履歴は削除できません'}), 409
             return jsonify({'error': '履歴が見つかりません'}), 404
 
-        db.session.delete(log)
-        db.session.commit()
+        today_entry_counter.discard(*previous)
+        entry_feed.invalidate()
 
         return jsonify({
             'success': True,
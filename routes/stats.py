@@ -0,0 +1,25 @@
+from flask import request, jsonify
+from . import api
+from services.attendance_stats import AttendanceStatsService
+
+@api.route('/stats/attendance', methods=['GET'])
+def get_attendance_stats():
+    """入園集計API（date_from, date_to の期間を group_by の軸で集計）"""
+    try:
+        params, error = AttendanceStatsService.parse_query(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+
+        rows = AttendanceStatsService.summarize(params)
+
+        return jsonify({
+            'success': True,
+            'date_from': params['date_from'].isoformat(),
+            'date_to': params['date_to'].isoformat(),
+            'group_by': params['group_by'],
+            'rows': rows,
+            'total': sum(row['count'] for row in rows)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'集計取得エラー: {str(e)}'}), 500
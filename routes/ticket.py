@@ -1,25 +1,60 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from datetime import datetime, timedelta
 from . import api
 from models.ticket import Ticket
+from models.entry_log import EntryLog
 from database import db
+from database.engine import retry_on_lock
 from services.validation import ValidationService
-import csv
-import io
+from services.import_jobs import ImportJobService
+from services.ticket_query import TicketQueryService
+from services.ticket_index import ticket_index
+from services.entry_counter import today_entry_counter
+from services.judgement_response import compact_judgement_serializer
+from services.attendance_stats import AttendanceStatsService
+from services.data_versions import DataVersionService, TICKETS, ENTRY_LOGS
+from services.history_query import HistoryQueryService
+from services.ticket_lineage import TicketLineageService
+from services.ticket_bulk import TicketBulkService
+from .caching import conditional_get, latest_log_id
+from .history import history_page
 
 @api.route('/tickets', methods=['GET'])
+@conditional_get(TICKETS)
 def get_tickets():
-    """チケット一覧取得API"""
+    """チケット一覧取得API（検索・ソート・ページング）"""
     try:
-        tickets = Ticket.query.order_by(Ticket.created_at.desc()).all()
+        filters, error = TicketQueryService.parse_filters(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+
+        query = TicketQueryService.apply_filters(Ticket.query, filters)
+        query, error = TicketQueryService.apply_sort(query, request.args.get('sort'), request.args.get('order'))
+        if error:
+            return jsonify({'error': error}), 400
+
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', current_app.config['TICKETS_PAGE_SIZE'], type=int)
+        pagination = query.paginate(
+            page=page,
+            per_page=per_page,
+            max_per_page=current_app.config['TICKETS_MAX_PAGE_SIZE'],
+            error_out=False
+        )
+
         return jsonify({
             'success': True,
-            'tickets': [ticket.to_dict() for ticket in tickets]
+            'tickets': [ticket.to_dict() for ticket in pagination.items],
+            'total': pagination.total,
+            'page': pagination.page,
+            'per_page': pagination.per_page,
+            'pages': pagination.pages
         }), 200
     except Exception as e:
         return jsonify({'error': f'チケット取得エラー: {str(e)}'}), 500
 
 @api.route('/tickets/<tkt_number>', methods=['GET'])
+@conditional_get(TICKETS)
 def get_ticket(tkt_number):
     """チケット詳細取得API"""
     try:
@@ -34,6 +69,36 @@ def get_ticket(tkt_number):
     except Exception as e:
         return jsonify({'error': f'チケット取得エラー: {str(e)}'}), 500
 
+@api.route('/tickets/<tkt_number>/lineage', methods=['GET'])
+@conditional_get(TICKETS, ENTRY_LOGS, watermark=latest_log_id)
+def get_ticket_lineage(tkt_number):
+    """振替の系譜取得API（系譜の全チケットと、それらの入園履歴をまとめて返す）"""
+    try:
+        chain = TicketLineageService.chain(tkt_number)
+        if not any(ticket.tkt_number == tkt_number for ticket in chain):
+            return jsonify({'error': 'チケットが見つかりません'}), 404
+
+        # 入園履歴は一覧APIと同じ条件（期間・判定結果・再入場）で絞り込める
+        filters, error = HistoryQueryService.parse_filters(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+        filters.pop('tkt_number', None)
+        # 系譜の再帰CTEを副問い合わせにして、TKT番号のリストを渡さずに1回のSQLで取得する
+        filters['tkt_numbers'] = TicketLineageService.members_query(tkt_number)
+
+        page, error = history_page(filters)
+        if error:
+            return jsonify({'error': error}), 400
+
+        return jsonify({
+            'success': True,
+            'tkt_number': tkt_number,
+            'lineage': [ticket.to_dict() for ticket in chain],
+            **page
+        }), 200
+    except Exception as e:
+        return jsonify({'error': f'系譜取得エラー: {str(e)}'}), 500
+
 @api.route('/tickets', methods=['POST'])
 def create_ticket():
     """チケット登録API"""
@@ -68,7 +133,9 @@ def create_ticket():
         )
 
         db.session.add(ticket)
+        DataVersionService.bump(TICKETS)
         db.session.commit()
+        ticket_index.put(ticket)
 
         return jsonify({
             'success': True,
@@ -110,7 +177,16 @@ def update_ticket(tkt_number):
 
         ticket.updated_at = datetime.utcnow()
 
+        # 集計の分類（券種・性別・年齢）が変わる場合は、このチケットの入園日の集計を作り直す
+        if any(key in data for key in ('age', 'gender', 'ticket_type')):
+            db.session.flush()
+            AttendanceStatsService.rebuild(
+                dates=AttendanceStatsService.entry_dates(EntryLog.tkt_number == tkt_number), commit=False
+            )
+
+        DataVersionService.bump(TICKETS)
         db.session.commit()
+        ticket_index.put(ticket)
 
         return jsonify({
             'success': True,
@@ -126,12 +202,28 @@ def update_ticket(tkt_number):
 def delete_ticket(tkt_number):
     """チケット削除API"""
     try:
-        ticket = Ticket.query.filter_by(tkt_number=tkt_number).first()
-        if not ticket:
+        @retry_on_lock
+        def apply_delete():
+            ticket = Ticket.query.filter_by(tkt_number=tkt_number).first()
+            if not ticket:
+                return False
+
+            # 削除される入園履歴の日付（集計を同じトランザクションで作り直す）
+            entry_dates = AttendanceStatsService.entry_dates(EntryLog.tkt_number == tkt_number)
+
+            db.session.delete(ticket)
+            db.session.flush()
+            AttendanceStatsService.rebuild(dates=entry_dates, commit=False)
+            DataVersionService.bump(TICKETS, ENTRY_LOGS)
+            db.session.commit()
+            return True
+
+        if not apply_delete():
             return jsonify({'error': 'チケットが見つかりません'}), 404
 
-        db.session.delete(ticket)
-        db.session.commit()
+        ticket_index.remove(tkt_number)
+        today_entry_counter.forget(tkt_number)
+        compact_judgement_serializer.forget(tkt_number)
 
         return jsonify({
             'success': True,
@@ -142,6 +234,22 @@ def delete_ticket(tkt_number):
         db.session.rollback()
         return jsonify({'error': f'チケット削除エラー: {str(e)}'}), 500
 
+@api.route('/tickets/bulk', methods=['POST'])
+def bulk_tickets():
+    """チケット一括操作API（有効期限の延長・券種の変更・削除）"""
+    try:
+        params, error = TicketBulkService.parse_request(request.get_json(silent=True))
+        if error:
+            return jsonify({'error': error}), 400
+
+        result = TicketBulkService.execute(params)
+
+        return jsonify({'success': True, **result}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'チケット一括操作エラー: {str(e)}'}), 500
+
 @api.route('/tickets/import', methods=['POST'])
 def import_tickets():
     """CSV一括登録API"""
@@ -156,46 +264,31 @@ def import_tickets():
         if not file.filename.endswith('.csv'):
             return jsonify({'error': 'CSVファイルを選択してください'}), 400
 
-        # CSVを読み込み
-        stream = io.StringIO(file.stream.read().decode("UTF-8"), newline=None)
-        csv_reader = csv.DictReader(stream)
-
-        success_count = 0
-        error_count = 0
-        errors = []
-
-        for row in csv_reader:
-            try:
-                # 有効期限の計算
-                start_date = datetime.strptime(row['使用開始日'], '%Y/%m/%d').date()
-                expiry_date = start_date + timedelta(days=365)
-
-                ticket = Ticket(
-                    tkt_number=row['TKT番号'],
-                    age=int(row['年齢']),
-                    gender=row['性別'],
-                    ticket_type=row['券種'],
-                    start_date=start_date,
-                    expiry_date=expiry_date,
-                    remarks=row.get('備考', '')
-                )
-
-                db.session.add(ticket)
-                db.session.commit()
-                success_count += 1
-
-            except Exception as e:
-                db.session.rollback()
-                error_count += 1
-                errors.append(f"TKT番号 {row.get('TKT番号', '不明')}: {str(e)}")
+        # バックグラウンドジョブとして一括登録を開始
+        job = ImportJobService.start(current_app._get_current_object(), file)
 
         return jsonify({
             'success': True,
-            'message': f'読み込み完了 成功: {success_count}件 エラー: {error_count}件',
-            'success_count': success_count,
-            'error_count': error_count,
-            'errors': errors
-        }), 200
+            'message': 'CSV読み込みを開始しました',
+            'job_id': job.id,
+            'status_url': f'/api/tickets/import/{job.id}'
+        }), 202
 
     except Exception as e:
         return jsonify({'error': f'CSV読み込みエラー: {str(e)}'}), 500
+
+@api.route('/tickets/import/<job_id>', methods=['GET'])
+def get_import_status(job_id):
+    """CSV一括登録ジョブの進捗取得API"""
+    try:
+        job = ImportJobService.get(job_id)
+        if not job:
+            return jsonify({'error': 'ジョブが見つかりません'}), 404
+
+        return jsonify({
+            'success': True,
+            'job': job.to_dict()
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'ジョブ取得エラー: {str(e)}'}), 500
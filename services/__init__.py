@@ -1,4 +1,44 @@
 from .entry_judgement import EntryJudgementService
 from .validation import ValidationService
+from .ticket_index import TicketIndex, ticket_index
+from .ticket_suggest import TicketSuggestionIndex
+from .entry_counter import TodayEntryCounter, today_entry_counter
+from .entry_queue import EntryWriteQueue, entry_write_queue
+from .judgement_response import CompactJudgementSerializer, compact_judgement_serializer
+from .ticket_import import TicketImportService
+from .import_jobs import ImportJobService
+from .history_query import HistoryQueryService
+from .ticket_query import TicketQueryService
+from .ticket_lineage import TicketLineageService
+from .ticket_bulk import TicketBulkService
+from .attendance_stats import AttendanceStatsService
+from .history_archive import HistoryArchiveService
+from .history_bulk import HistoryBulkService
+from .data_versions import DataVersionService
+from .cache_coherence import CacheCoherence, cache_coherence
 
-__all__ = ['EntryJudgementService', 'ValidationService']
+__all__ = [
+    'EntryJudgementService',
+    'ValidationService',
+    'TicketIndex',
+    'ticket_index',
+    'TicketSuggestionIndex',
+    'TodayEntryCounter',
+    'today_entry_counter',
+    'EntryWriteQueue',
+    'entry_write_queue',
+    'CompactJudgementSerializer',
+    'compact_judgement_serializer',
+    'TicketImportService',
+    'ImportJobService',
+    'HistoryQueryService',
+    'TicketQueryService',
+    'TicketLineageService',
+    'TicketBulkService',
+    'AttendanceStatsService',
+    'HistoryArchiveService',
+    'HistoryBulkService',
+    'DataVersionService',
+    'CacheCoherence',
+    'cache_coherence'
+]
@@ -0,0 +1,305 @@
+"""入園集計（日付・時間帯 × 券種・性別・年齢層・判定結果・再入場）
+
+入園履歴の記録と同じトランザクションで attendance_stats の件数を加算し、
+集計APIは生の入園履歴を走査せずに集計テーブルのみを参照する。
+券種・性別・年齢はチケットの現在の情報で分類する（未登録のTKT番号は空文字）。
+履歴の編集・削除やチケットの券種・性別・年齢の変更時は、減算ではなく
+該当する日付を rebuild(dates=...) で同じトランザクション内で作り直し、
+記録時の加算と作り直し後の件数が食い違わないようにする。
+既存の履歴からの作成・作り直しは rebuild()（flask stats-rebuild）で行う。
+"""
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, and_, or_
+from models.attendance_stat import AttendanceStat
+from models.entry_log import EntryLog
+from models.ticket import Ticket
+from database import db
+from database.engine import upsert
+from services.ticket_index import ticket_index
+from services.validation import ValidationService
+
+# 集計キーの列（この順で一意制約を定義）
+KEY_COLUMNS = ['stat_date', 'hour', 'ticket_type', 'gender', 'age_band', 'result', 'is_reentry']
+
+# rebuild() で1回の問い合わせに含める期間の数
+RANGES_PER_QUERY = 100
+
+# group_by に指定できる軸 → 集計テーブルの列
+GROUP_COLUMNS = {
+    'date': AttendanceStat.stat_date,
+    'hour': AttendanceStat.hour,
+    'ticket_type': AttendanceStat.ticket_type,
+    'gender': AttendanceStat.gender,
+    'age_band': AttendanceStat.age_band,
+    'result': AttendanceStat.result,
+    'is_reentry': AttendanceStat.is_reentry
+}
+
+
+class AttendanceStatsService:
+    """入園集計サービス"""
+
+    @staticmethod
+    def age_band(age):
+        """年齢を年齢層のラベルに変換（STATS_AGE_BANDS の各境界から次の境界の手前まで）"""
+        if age is None:
+            return ''
+        bounds = current_app.config['STATS_AGE_BANDS']
+        label = ''
+        for i, lower in enumerate(bounds):
+            if age < lower:
+                break
+            upper = bounds[i + 1] - 1 if i + 1 < len(bounds) else None
+            label = f'{lower}-{upper}' if upper is not None else f'{lower}-'
+        return label
+
+    @staticmethod
+    def _key(entry_time, result, is_reentry, ticket_type, gender, age):
+        """集計キー（KEY_COLUMNS の順）"""
+        return (
+            entry_time.date(),
+            entry_time.hour,
+            ticket_type or '',
+            gender or '',
+            AttendanceStatsService.age_band(age),
+            result,
+            bool(is_reentry)
+        )
+
+    @staticmethod
+    def _key_for(tkt_number, entry_time, result, is_reentry):
+        """チケットインデックスの情報から集計キーを作成"""
+        ticket = ticket_index.get(tkt_number)
+        if ticket is None:
+            return AttendanceStatsService._key(entry_time, result, is_reentry, None, None, None)
+        return AttendanceStatsService._key(
+            entry_time, result, is_reentry, ticket.ticket_type, ticket.gender, ticket.age
+        )
+
+    @staticmethod
+    def apply(changes):
+        """
+        集計に増減を反映する（コミットは呼び出し側で行う）
+
+        Args:
+            changes: [(tkt_number, entry_time, result, is_reentry, 増減数), ...]
+        """
+        deltas = {}
+        for tkt_number, entry_time, result, is_reentry, delta in changes:
+            key = AttendanceStatsService._key_for(tkt_number, entry_time, result, is_reentry)
+            deltas[key] = deltas.get(key, 0) + delta
+
+        rows = [dict(zip(KEY_COLUMNS, key), count=delta) for key, delta in deltas.items() if delta]
+        if not rows:
+            return
+
+        stmt = upsert(AttendanceStat)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=KEY_COLUMNS,
+            set_={'count': AttendanceStat.count + stmt.excluded['count']}
+        )
+        db.session.execute(stmt, rows)
+
+        # 減算で0件になったキーを削除
+        if any(row['count'] < 0 for row in rows):
+            AttendanceStat.query.filter(
+                AttendanceStat.stat_date.in_({row['stat_date'] for row in rows}),
+                AttendanceStat.count <= 0
+            ).delete(synchronize_session=False)
+
+    @staticmethod
+    def add_logs(logs):
+        """記録する入園履歴を集計に加算（コミットは呼び出し側で行う）"""
+        AttendanceStatsService.apply(
+            (log.tkt_number, log.entry_time, log.result, log.is_reentry, 1) for log in logs
+        )
+
+    @staticmethod
+    def entry_dates(*criteria):
+        """条件に一致する入園履歴の日付の集合（集計を作り直す対象日）"""
+        return {
+            day if isinstance(day, date) else date.fromisoformat(day)
+            for (day,) in EntryLog.query.with_entities(
+                func.date(EntryLog.entry_time)
+            ).filter(*criteria).distinct()
+        }
+
+    @staticmethod
+    def _date_ranges(dates):
+        """日付の集合を連続する期間 [(開始日, 終了日), ...] にまとめる"""
+        ranges = []
+        for day in sorted(dates):
+            if ranges and day == ranges[-1][1] + timedelta(days=1):
+                ranges[-1] = (ranges[-1][0], day)
+            else:
+                ranges.append((day, day))
+        return ranges
+
+    @staticmethod
+    def rebuild(date_from=None, date_to=None, dates=None, commit=True):
+        """
+        入園履歴から集計を作り直す（アプリケーションコンテキスト内で呼び出す）
+
+        Args:
+            date_from: 開始日（省略時は最も古い履歴の日付）
+            date_to: 終了日（省略時は最も新しい履歴の日付）
+            dates: 対象日の集合（指定時は date_from/date_to より優先）
+            commit: False の場合はコミットせず、呼び出し側のトランザクションに含める
+
+        Returns:
+            tuple: (集計した入園履歴の件数, 作成した集計行の件数)
+        """
+        if dates is not None:
+            dates = set(dates)
+            if not dates:
+                return 0, 0
+            date_from, date_to = min(dates), max(dates)
+        elif date_from is None or date_to is None:
+            oldest, newest = EntryLog.query.with_entities(
+                func.min(EntryLog.entry_time), func.max(EntryLog.entry_time)
+            ).one()
+            if oldest is None:
+                return 0, 0
+            date_from = date_from or oldest.date()
+            date_to = date_to or newest.date()
+
+        # アーカイブ済みの月は entry_logs に残っていないため、作成済みの集計をそのまま残す
+        from services.history_archive import HistoryArchiveService
+        archived_until = HistoryArchiveService.archived_until()
+        if archived_until and date_from < archived_until:
+            date_from = archived_until
+            if dates is not None:
+                dates = {day for day in dates if day >= archived_until}
+                if not dates:
+                    return 0, 0
+            if date_from > date_to:
+                return 0, 0
+
+        # 対象日の入園履歴だけを走査する（連続する日はまとめて1つの範囲にする）
+        if dates is not None:
+            ranges = AttendanceStatsService._date_ranges(dates)
+        else:
+            ranges = [(date_from, date_to)]
+
+        counts = {}
+        log_count = 0
+        # 条件式が深くなりすぎないよう、期間は一定数ずつ問い合わせる
+        for start in range(0, len(ranges), RANGES_PER_QUERY):
+            period = or_(*[
+                and_(
+                    EntryLog.entry_time >= datetime.combine(first, datetime.min.time()),
+                    EntryLog.entry_time < datetime.combine(last + timedelta(days=1), datetime.min.time())
+                )
+                for first, last in ranges[start:start + RANGES_PER_QUERY]
+            ])
+            rows = EntryLog.query.outerjoin(
+                Ticket, Ticket.tkt_number == EntryLog.tkt_number
+            ).with_entities(
+                EntryLog.entry_time,
+                EntryLog.result,
+                EntryLog.is_reentry,
+                Ticket.ticket_type,
+                Ticket.gender,
+                Ticket.age
+            ).filter(period).yield_per(current_app.config.get('EXPORT_BATCH_SIZE', 1000))
+
+            for row in rows:
+                key = AttendanceStatsService._key(
+                    row.entry_time, row.result, row.is_reentry, row.ticket_type, row.gender, row.age
+                )
+                counts[key] = counts.get(key, 0) + 1
+                log_count += 1
+
+        # 集計を終えてから削除・作成する（書き込みの時間を短くする）
+        delete_query = AttendanceStat.query
+        if dates is not None:
+            delete_query = delete_query.filter(AttendanceStat.stat_date.in_(dates))
+        else:
+            delete_query = delete_query.filter(
+                AttendanceStat.stat_date >= date_from,
+                AttendanceStat.stat_date <= date_to
+            )
+        delete_query.delete(synchronize_session=False)
+
+        if counts:
+            db.session.bulk_insert_mappings(AttendanceStat, [
+                dict(zip(KEY_COLUMNS, key), count=count) for key, count in counts.items()
+            ])
+        if commit:
+            db.session.commit()
+
+        return log_count, len(counts)
+
+    @staticmethod
+    def parse_query(args):
+        """
+        集計APIのクエリパラメータを解析
+
+        Returns:
+            tuple: (params dict, エラーメッセージ or None)
+        """
+        params = {}
+
+        for key in ('date_from', 'date_to'):
+            value = (args.get(key) or '').strip()
+            if not value:
+                continue
+            valid, msg = ValidationService.validate_date(value)
+            if not valid:
+                return None, f'{key}: {msg}'
+            params[key] = datetime.strptime(value, '%Y-%m-%d').date()
+
+        # 期間の指定がない場合は本日
+        today = datetime.now().date()
+        params.setdefault('date_from', params.get('date_to', today))
+        params.setdefault('date_to', max(params['date_from'], today))
+        if params['date_from'] > params['date_to']:
+            return None, 'date_from は date_to 以前の日付を指定してください'
+
+        group_by = [name.strip() for name in (args.get('group_by') or 'date').split(',') if name.strip()]
+        unknown = [name for name in group_by if name not in GROUP_COLUMNS]
+        if unknown:
+            return None, f"group_by に指定できるのは {', '.join(GROUP_COLUMNS)} です"
+        params['group_by'] = group_by
+
+        for key in ('ticket_type', 'gender', 'age_band', 'result'):
+            value = args.get(key)
+            if value is not None and value != '':
+                params[key] = value
+
+        is_reentry = (args.get('is_reentry') or '').strip().lower()
+        if is_reentry:
+            if is_reentry not in ('true', 'false', '1', '0'):
+                return None, 'is_reentry は true または false を指定してください'
+            params['is_reentry'] = is_reentry in ('true', '1')
+
+        return params, None
+
+    @staticmethod
+    def summarize(params):
+        """集計テーブルを指定の軸で合計する"""
+        columns = [GROUP_COLUMNS[name] for name in params['group_by']]
+
+        query = AttendanceStat.query.with_entities(
+            *columns,
+            func.sum(AttendanceStat.count)
+        ).filter(
+            AttendanceStat.stat_date >= params['date_from'],
+            AttendanceStat.stat_date <= params['date_to']
+        )
+        for key in ('ticket_type', 'gender', 'age_band', 'result', 'is_reentry'):
+            if key in params:
+                query = query.filter(GROUP_COLUMNS[key] == params[key])
+
+        rows = query.group_by(*columns).order_by(*columns).all()
+
+        results = []
+        for row in rows:
+            item = {}
+            for name, value in zip(params['group_by'], row):
+                item[name] = value.isoformat() if name == 'date' else value
+            item['count'] = int(row[-1] or 0)
+            results.append(item)
+
+        return results
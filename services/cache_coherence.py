@@ -0,0 +1,171 @@
+"""ワーカー間のキャッシュ整合（チケットインデックス・当日入場カウンタ）
+
+Gunicornの各ワーカーはチケットインデックスと当日入場カウンタをプロセス内に保持するため、
+他のワーカーで行われた変更を検出して反映する。検出にはデータベースのみを使用する。
+
+- data_versions のバージョン: チケット・入園履歴の変更（登録・更新・削除・アーカイブ）
+- entry_logs の最大ID: 入場判定による入園履歴の追加（バージョンを進めない）
+
+リクエストの処理前に CACHE_CHECK_INTERVAL 秒に1回まで確認し、
+自プロセスのコミットで説明できない変更があれば該当するキャッシュを読み込み直す。
+入園履歴の追加のみの場合は、他のワーカーが追加した当日のOK履歴だけをカウンタに加算する。
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from models.entry_log import EntryLog
+from database import db
+from services.data_versions import DataVersionService, TICKETS, ENTRY_LOGS
+from services.ticket_index import ticket_index
+from services.entry_counter import today_entry_counter
+from services.entry_feed import entry_feed
+from services.entry_queue import entry_write_queue
+from services.judgement_response import compact_judgement_serializer
+
+
+class CacheCoherence:
+    """他ワーカーでの変更をプロセス内キャッシュに反映する"""
+
+    def __init__(self):
+        self._versions = {}  # データ種別 → 反映済みのバージョン
+        self._own_versions = Counter()  # 前回の確認後に自プロセスがコミットしたバージョンの更新回数
+        self._own_log_ids = set()  # 自プロセスが追加した（カウンタに反映済みの）入園履歴ID
+        self._watermark = 0  # 反映済みの入園履歴の最大ID
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self.loaded = False
+
+    def reset(self):
+        """現在のバージョン・最大IDを反映済みとして記録（キャッシュの読み込み前に呼び出す）"""
+        versions = DataVersionService.get_all(refresh=True)
+        latest_id = db.session.query(func.max(EntryLog.id)).scalar() or 0
+        with self._lock:
+            self._versions = {name: version for name, (version, _) in versions.items()}
+            self._own_versions = Counter()
+            self._own_log_ids = set()
+            self._watermark = latest_id
+        self._next_check = time.monotonic() + current_app.config['CACHE_CHECK_INTERVAL']
+        self.loaded = True
+
+    def check(self):
+        """確認間隔を過ぎていれば他ワーカーでの変更を反映（アプリケーションコンテキスト内で呼び出す）"""
+        if not self.loaded or time.monotonic() < self._next_check:
+            return
+        # 他のスレッドが確認中であれば待たずに処理を続ける
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = time.monotonic() + current_app.config['CACHE_CHECK_INTERVAL']
+            self._sync()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'キャッシュの整合確認に失敗しました: {e}')
+        finally:
+            self._check_lock.release()
+
+    def _sync(self):
+        versions = DataVersionService.get_all(refresh=True)
+        latest_id = db.session.query(func.max(EntryLog.id)).scalar() or 0
+
+        stale = set()
+        with self._lock:
+            own_versions, self._own_versions = self._own_versions, Counter()
+            for name in (TICKETS, ENTRY_LOGS):
+                version = versions.get(name, (0, None))[0]
+                if version > self._versions.get(name, 0) + own_versions[name]:
+                    stale.add(name)
+                self._versions[name] = version
+            watermark = self._watermark
+
+        if TICKETS in stale:
+            ticket_index.load()
+            compact_judgement_serializer.clear()
+
+        if ENTRY_LOGS in stale:
+            # 他ワーカーで履歴が更新・削除された場合はカウンタを作り直す
+            self.reload_counter()
+            entry_feed.invalidate()
+        elif latest_id > watermark:
+            self._add_new_entries(watermark, latest_id)
+
+        with self._lock:
+            self._watermark = max(self._watermark, latest_id)
+            self._own_log_ids = {log_id for log_id in self._own_log_ids if log_id > latest_id}
+
+    def reload_counter(self):
+        """当日入場カウンタを読み込み直す（ライトビハインドの未反映分も加算する）"""
+        today_entry_counter.load()
+        if entry_write_queue.enabled:
+            for row in entry_write_queue.pending_rows():
+                today_entry_counter.add(row['tkt_number'], datetime.fromisoformat(row['entry_time']), row['result'])
+
+    def _add_new_entries(self, after_id, until_id):
+        """他ワーカーが追加した当日のOK履歴をカウンタに加算"""
+        day_start = datetime.combine(today_entry_counter.today(), datetime.min.time())
+        rows = db.session.execute(
+            select(EntryLog.id, EntryLog.tkt_number, EntryLog.entry_time, EntryLog.result).where(
+                EntryLog.id > after_id,
+                EntryLog.id <= until_id,
+                EntryLog.entry_time >= day_start,
+                EntryLog.entry_time < day_start + timedelta(days=1),
+                EntryLog.result == 'OK'
+            )
+        ).all()
+
+        with self._lock:
+            own_log_ids = set(self._own_log_ids)
+        for row in rows:
+            if row.id not in own_log_ids:
+                today_entry_counter.add(row.tkt_number, row.entry_time, row.result)
+
+    # ---- 自プロセスの変更の記録（セッションのイベントから呼び出す） ----
+
+    def absorb_versions(self, names):
+        """自プロセスがコミットしたバージョンの更新を記録"""
+        with self._lock:
+            self._own_versions.update(names)
+
+    def absorb_log_ids(self, log_ids):
+        """自プロセスが追加する入園履歴のIDを記録"""
+        with self._lock:
+            self._own_log_ids.update(log_ids)
+
+    def discard_log_ids(self, log_ids):
+        """ロールバックされた入園履歴のIDを除外"""
+        with self._lock:
+            self._own_log_ids.difference_update(log_ids)
+
+
+# アプリケーション全体で共有するインスタンス
+cache_coherence = CacheCoherence()
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_inserted_logs(session, flush_context):
+    # 行が他のワーカーから見える（コミットされる）前にIDを記録し、二重に加算しないようにする
+    log_ids = [obj.id for obj in session.new if isinstance(obj, EntryLog) and obj.id is not None]
+    if log_ids:
+        session.info.setdefault('inserted_log_ids', []).extend(log_ids)
+        cache_coherence.absorb_log_ids(log_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _record_commit(session):
+    session.info.pop('inserted_log_ids', None)
+    bumped = session.info.pop('bumped_versions', None)
+    if bumped:
+        cache_coherence.absorb_versions(bumped)
+        DataVersionService.forget()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _record_rollback(session):
+    session.info.pop('bumped_versions', None)
+    log_ids = session.info.pop('inserted_log_ids', None)
+    if log_ids:
+        cache_coherence.discard_log_ids(log_ids)
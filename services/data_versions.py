@@ -0,0 +1,79 @@
+"""データ種別ごとの更新バージョン
+
+チケット・入園履歴を変更する処理は、同じトランザクション内で bump() を呼び出して
+data_versions のバージョンを進める。読み取りAPIはバージョンからETagを作成し、
+変更がなければクエリを実行せずに 304 を返す。
+
+get() は全種別のバージョンを DATA_VERSION_CACHE_SECONDS の間プロセス内に保持する。
+このプロセスでの変更は、コミット時に保持している値を破棄するため直ちに反映される
+（他ワーカーでの変更は最大で保持期間だけ遅れて反映される）。
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import current_app
+from models.data_version import DataVersion
+from database import db
+from database.engine import upsert
+
+# バージョンを管理するデータ種別
+TICKETS = 'tickets'
+ENTRY_LOGS = 'entry_logs'
+
+# プロセス内に保持するバージョン（{データ種別: (バージョン, 更新日時UTC)}, 取得時刻）
+_cache = {'versions': None, 'fetched_at': 0.0, 'generation': 0}
+_cache_lock = threading.Lock()
+
+
+class DataVersionService:
+    """データ更新バージョンサービス"""
+
+    @staticmethod
+    def bump(*names):
+        """バージョンを1つ進める（コミットは呼び出し側で行う）"""
+        # コミット時に自プロセスの変更として扱うため、セッションに記録しておく
+        db.session.info.setdefault('bumped_versions', Counter()).update(names)
+
+        now = datetime.utcnow()
+        stmt = upsert(DataVersion)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'version': DataVersion.version + 1, 'updated_at': stmt.excluded['updated_at']}
+        )
+        db.session.execute(stmt, [{'name': name, 'version': 1, 'updated_at': now} for name in names])
+
+    @staticmethod
+    def get_all(refresh=False):
+        """全種別の {データ種別: (バージョン, 更新日時UTC)} を返す（refresh=True で必ず再取得）"""
+        if not refresh:
+            with _cache_lock:
+                versions, fetched_at = _cache['versions'], _cache['fetched_at']
+            if versions is not None and time.monotonic() - fetched_at < current_app.config['DATA_VERSION_CACHE_SECONDS']:
+                return versions
+
+        with _cache_lock:
+            generation = _cache['generation']
+        fetched_at = time.monotonic()
+        versions = {
+            row.name: (row.version, row.updated_at)
+            for row in db.session.execute(db.select(DataVersion.name, DataVersion.version, DataVersion.updated_at))
+        }
+        with _cache_lock:
+            # 取得中に破棄された場合は、変更前の値の可能性があるため保持しない
+            if _cache['generation'] == generation:
+                _cache['versions'] = versions
+                _cache['fetched_at'] = fetched_at
+        return versions
+
+    @staticmethod
+    def get(name):
+        """(バージョン, 更新日時UTC) を返す（未更新の場合は (0, None)）"""
+        return DataVersionService.get_all().get(name, (0, None))
+
+    @staticmethod
+    def forget():
+        """保持しているバージョンを破棄（次回の get() で再取得する）"""
+        with _cache_lock:
+            _cache['versions'] = None
+            _cache['generation'] += 1
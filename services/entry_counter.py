@@ -0,0 +1,92 @@
+import threading
+from datetime import datetime, date, timedelta
+from sqlalchemy import func
+from models.entry_log import EntryLog
+
+
+class TodayEntryCounter:
+    """当日（営業日）のOK入場回数をTKT番号ごとに保持するカウンタ"""
+
+    def __init__(self):
+        self._business_date = None
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    @staticmethod
+    def business_date_of(entry_time):
+        """入園時間が属する営業日を返す"""
+        return entry_time.date() if entry_time else None
+
+    @staticmethod
+    def today():
+        """現在の営業日を返す"""
+        return date.today()
+
+    def _roll_over(self):
+        """日付が変わっていればカウンタをリセット（ロック取得済みで呼び出す）"""
+        today = self.today()
+        if self._business_date != today:
+            self._business_date = today
+            self._counts = {}
+
+    def load(self):
+        """当日のOK履歴からカウンタを構築する（アプリケーションコンテキスト内で呼び出す）"""
+        today = self.today()
+        day_start = datetime.combine(today, datetime.min.time())
+        day_end = day_start + timedelta(days=1)
+
+        rows = EntryLog.query.with_entities(
+            EntryLog.tkt_number,
+            func.count(EntryLog.id)
+        ).filter(
+            EntryLog.entry_time >= day_start,
+            EntryLog.entry_time < day_end,
+            EntryLog.result == 'OK'
+        ).group_by(EntryLog.tkt_number).all()
+
+        with self._lock:
+            self._business_date = today
+            self._counts = {tkt_number: count for tkt_number, count in rows}
+            self.loaded = True
+
+        return len(self._counts)
+
+    def count(self, tkt_number):
+        """当日のOK入場回数を返す"""
+        with self._lock:
+            self._roll_over()
+            return self._counts.get(tkt_number, 0)
+
+    def add(self, tkt_number, entry_time, result):
+        """入園履歴の追加を反映"""
+        if result != 'OK':
+            return
+        with self._lock:
+            self._roll_over()
+            if self.business_date_of(entry_time) != self._business_date:
+                return
+            self._counts[tkt_number] = self._counts.get(tkt_number, 0) + 1
+
+    def discard(self, tkt_number, entry_time, result):
+        """入園履歴の削除を反映"""
+        if result != 'OK':
+            return
+        with self._lock:
+            self._roll_over()
+            if self.business_date_of(entry_time) != self._business_date:
+                return
+            remaining = self._counts.get(tkt_number, 0) - 1
+            if remaining > 0:
+                self._counts[tkt_number] = remaining
+            else:
+                self._counts.pop(tkt_number, None)
+
+    def forget(self, tkt_number):
+        """チケット削除に伴い、そのTKT番号の当日分をすべて破棄"""
+        with self._lock:
+            self._counts.pop(tkt_number, None)
+
+
+# アプリケーション全体で共有するカウンタ
+today_entry_counter = TodayEntryCounter()
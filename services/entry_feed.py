@@ -0,0 +1,182 @@
+"""入園履歴のリアルタイム配信（Server-Sent Events 用のハブ）
+
+プロセスごとに1つのポーリングスレッドが entry_logs を ID の順に追いかけ、
+新しい履歴と当日の時間帯別カウンタを購読中のダッシュボードへ配信する。
+ダッシュボードが何台あってもDBへの問い合わせはプロセスあたり1本で、
+自プロセスでの記録時は notify() により間隔を待たずに配信する。
+購読者がいない間はポーリングしない。
+"""
+import queue
+import threading
+from datetime import datetime, timedelta
+from models.entry_log import EntryLog
+from services.entry_counter import TodayEntryCounter
+
+
+class EntryFeed:
+    """新しい入園履歴と当日の集計を購読者へ配信するハブ"""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._app = None
+        self._watermark = None
+        self._business_date = None
+        self._hours = {}
+        self._stale = True
+
+    # ---- 購読 ----
+
+    def subscribe(self, app):
+        """購読を開始し、(イベントキュー, 現在の集計) を返す"""
+        subscriber = queue.Queue(maxsize=app.config.get('FEED_QUEUE_SIZE', 100))
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._app = app
+                self._thread = threading.Thread(target=self._run, name='entry-feed', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return subscriber, self.stats()
+
+    def unsubscribe(self, subscriber):
+        """購読を終了"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def notify(self):
+        """新しい履歴が記録されたことを通知（次のポーリングを即時に行う）"""
+        if self._subscribers:
+            self._wakeup.set()
+
+    def invalidate(self):
+        """履歴の更新・削除に伴い、次回のポーリングで当日の集計を作り直す"""
+        self._stale = True
+        self.notify()
+
+    # ---- 集計 ----
+
+    def stats(self):
+        """当日の時間帯別集計 {'date', 'hours': [...], 'total': {...}}"""
+        with self._lock:
+            hours = [dict(hour=hour, **counts) for hour, counts in sorted(self._hours.items())]
+            business_date = self._business_date
+        total = {
+            key: sum(counts[key] for counts in hours)
+            for key in ('ok', 'ng', 'reentry')
+        }
+        return {
+            'date': business_date.isoformat() if business_date else None,
+            'hours': hours,
+            'total': total
+        }
+
+    def _count(self, hours, entry_time, result, is_reentry):
+        """1件分を時間帯別集計に加算"""
+        counts = hours.setdefault(entry_time.hour, {'ok': 0, 'ng': 0, 'reentry': 0})
+        counts['ok' if result == 'OK' else 'ng'] += 1
+        if is_reentry:
+            counts['reentry'] += 1
+
+    def _reload(self):
+        """当日の履歴から集計と配信位置を作り直す（アプリケーションコンテキスト内で呼び出す）"""
+        today = TodayEntryCounter.today()
+        day_start = datetime.combine(today, datetime.min.time())
+
+        # 先に最大IDを確定し、集計はそのID以下に限る（以降の履歴はポーリングで1回だけ加算する）
+        watermark = EntryLog.query.with_entities(EntryLog.id).order_by(EntryLog.id.desc()).limit(1).scalar() or 0
+
+        rows = EntryLog.query.with_entities(
+            EntryLog.id,
+            EntryLog.entry_time,
+            EntryLog.result,
+            EntryLog.is_reentry
+        ).filter(
+            EntryLog.entry_time >= day_start,
+            EntryLog.entry_time < day_start + timedelta(days=1),
+            EntryLog.id <= watermark
+        ).all()
+
+        hours = {}
+        for row in rows:
+            self._count(hours, row.entry_time, row.result, row.is_reentry)
+
+        with self._lock:
+            self._business_date = today
+            self._hours = hours
+            self._watermark = watermark
+            self._stale = False
+
+    # ---- ポーリング ----
+
+    def _run(self):
+        """購読者がいる間、新しい履歴を取得して配信する"""
+        interval = self._app.config.get('FEED_POLL_INTERVAL', 1.0)
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # 停止中の変更は追いかけないため、次の購読開始時に作り直す
+                    self._thread = None
+                    self._watermark = None
+                    self._stale = True
+                    return
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            try:
+                with self._app.app_context():
+                    self._poll()
+            except Exception as e:
+                self._app.logger.error(f'入園履歴の配信に失敗しました: {e}')
+
+    def _poll(self):
+        """配信位置より新しい履歴を取得し、集計に反映して配信"""
+        if self._stale or self._business_date != TodayEntryCounter.today():
+            self._reload()
+            self._publish({'type': 'stats', 'stats': self.stats()})
+
+        batch_size = self._app.config.get('FEED_POLL_BATCH_SIZE', 500)
+        while True:
+            logs = EntryLog.query.filter(
+                EntryLog.id > self._watermark
+            ).order_by(EntryLog.id).limit(batch_size).all()
+            if not logs:
+                return
+
+            with self._lock:
+                for log in logs:
+                    if TodayEntryCounter.business_date_of(log.entry_time) == self._business_date:
+                        self._count(self._hours, log.entry_time, log.result, log.is_reentry)
+                self._watermark = logs[-1].id
+
+            self._publish({
+                'type': 'entries',
+                'logs': [log.to_dict() for log in logs],
+                'stats': self.stats()
+            })
+
+            if len(logs) < batch_size:
+                return
+
+    def _publish(self, event):
+        """全購読者のキューへイベントを追加（溢れた購読者には再読み込みを要求）"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                # 受信側でイベントを加工できるよう、購読者ごとに複製して渡す
+                subscriber.put_nowait(dict(event))
+            except queue.Full:
+                # 受信が追いつかない購読者は取りこぼしが出るため、一覧の再取得を促す
+                while True:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        break
+                subscriber.put_nowait({'type': 'reset'})
+
+
+# アプリケーション全体で共有するハブ
+entry_feed = EntryFeed()
@@ -1,18 +1,26 @@
-from datetime import datetime, date
-from models.ticket import Ticket
+from datetime import datetime, date, timedelta
+from flask import current_app
 from models.entry_log import EntryLog
 from database import db
+from database.engine import retry_on_lock
+from services.ticket_index import ticket_index, TicketIndex
+from services.entry_counter import today_entry_counter
+from services.entry_queue import entry_write_queue
+from services.entry_feed import entry_feed
+from services.attendance_stats import AttendanceStatsService
 
 class EntryJudgementService:
     """入場判定サービス"""
 
     @staticmethod
-    def judge(tkt_number):
+    def judge(tkt_number, ticket_dict=True):
         """
         TKT番号による入場判定を実行する
 
         Args:
             tkt_number: TKT番号
+            ticket_dict: Falseの場合、'ticket' に辞書ではなくインデックスのエントリをそのまま返す
+                         （コンパクトレスポンスのシリアライザ向け）
 
         Returns:
             dict: 判定結果 {
@@ -20,11 +28,38 @@ class EntryJudgementService:
                 'result': str ('OK' or 'NG'),
                 'comment': str,
                 'is_reentry': bool,
-                'ticket': dict or None
+                'ticket': dict or None,
+                'suggestions': list（登録なしの場合のみ。近い登録済みTKT番号）
             }
         """
-        # 1. TKT番号の存在確認
-        ticket = Ticket.query.filter_by(tkt_number=tkt_number).first()
+        result = EntryJudgementService._decide(
+            tkt_number,
+            date.today(),
+            EntryJudgementService._count_today_entries,
+            ticket_dict
+        )
+
+        # 登録なしの場合は入力ミスの訂正候補を添える
+        if result['ticket'] is None:
+            result['suggestions'] = ticket_index.suggest(tkt_number, current_app.config['SUGGEST_MAX_RESULTS'])
+
+        return result
+
+    @staticmethod
+    def _decide(tkt_number, on_date, count_entries, ticket_dict=True):
+        """
+        指定日の入場判定を行う（judge と一括判定で共通の判定ルール）
+
+        Args:
+            tkt_number: TKT番号
+            on_date: 判定対象日
+            count_entries: 対象日のOK入場回数を返す関数 count_entries(tkt_number)
+            ticket_dict: 'ticket' を辞書に変換するかどうか
+        """
+        # 1. TKT番号の存在確認（プロセス内インデックスを参照し、DBには問い合わせない）
+        if not ticket_index.loaded:
+            ticket_index.load()
+        ticket = ticket_index.get(tkt_number)
         if not ticket:
             return {
                 'valid': False,
@@ -34,18 +69,20 @@ class EntryJudgementService:
                 'ticket': None
             }
 
+        ticket_info = TicketIndex.entry_to_dict(ticket) if ticket_dict else ticket
+
         # 2. 有効期限チェック
-        if EntryJudgementService._is_expired(ticket.expiry_date):
+        if EntryJudgementService._is_expired(ticket.expiry_date, on_date):
             return {
                 'valid': False,
                 'result': 'NG',
                 'comment': '有効期限切れ',
                 'is_reentry': False,
-                'ticket': ticket.to_dict()
+                'ticket': ticket_info
             }
 
         # 3. 当日入場回数チェック（再入場判定）
-        today_entries = EntryJudgementService._count_today_entries(tkt_number)
+        today_entries = count_entries(tkt_number)
         is_reentry = today_entries >= 1
 
         # 4. 判定OK（入場回数制限なし）
@@ -55,33 +92,33 @@ class EntryJudgementService:
             'result': 'OK',
             'comment': comment,
             'is_reentry': is_reentry,
-            'ticket': ticket.to_dict()
+            'ticket': ticket_info
         }
 
     @staticmethod
-    def _is_expired(expiry_date):
+    def _is_expired(expiry_date, on_date=None):
         """有効期限が切れているかチェック"""
         if not expiry_date:
             return True
-        today = date.today()
+        today = on_date or date.today()
         return expiry_date < today
 
     @staticmethod
     def _count_today_entries(tkt_number):
-        """当日の入場回数をカウント"""
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-
-        count = EntryLog.query.filter(
-            EntryLog.tkt_number == tkt_number,
-            EntryLog.entry_time >= today_start,
-            EntryLog.entry_time <= today_end,
-            EntryLog.result == 'OK'
-        ).count()
+        """当日の入場回数をカウント（当日入場カウンタを参照）"""
+        if not today_entry_counter.loaded:
+            today_entry_counter.load()
+        return sum(today_entry_counter.count(number) for number in EntryJudgementService._holder_tickets(tkt_number))
 
-        return count
+    @staticmethod
+    def _holder_tickets(tkt_number):
+        """再入場判定で同じ来園者として数えるTKT番号（REENTRY_ACROSS_TRANSFERS 有効時は振替の系譜全体）"""
+        if current_app.config.get('REENTRY_ACROSS_TRANSFERS'):
+            return ticket_index.lineage(tkt_number)
+        return (tkt_number,)
 
     @staticmethod
+    @retry_on_lock
     def record_entry(tkt_number, result, comment, is_reentry=False):
         """
         入園履歴を記録する
@@ -93,7 +130,7 @@ class EntryJudgementService:
             is_reentry: 再入場フラグ
 
         Returns:
-            EntryLog: 記録された入園履歴
+            EntryLog: 記録された入園履歴（ライトビハインド有効時はID未採番）
         """
         entry_log = EntryLog(
             tkt_number=tkt_number,
@@ -103,7 +140,109 @@ class EntryJudgementService:
             is_reentry=is_reentry
         )
 
+        # ライトビハインド有効時はジャーナルへの追記のみ行い、DBへはバックグラウンドで書き込む
+        if entry_write_queue.enabled:
+            entry_write_queue.enqueue(tkt_number, entry_log.entry_time, result, comment, is_reentry)
+            today_entry_counter.add(tkt_number, entry_log.entry_time, result)
+            return entry_log
+
         db.session.add(entry_log)
+        AttendanceStatsService.add_logs([entry_log])
         db.session.commit()
+        today_entry_counter.add(tkt_number, entry_log.entry_time, result)
+        entry_feed.notify()
 
         return entry_log
+
+    @staticmethod
+    @retry_on_lock
+    def judge_batch(scans):
+        """
+        端末に蓄積されたスキャンを元の入園時間で一括判定し、1トランザクションで記録する
+
+        Args:
+            scans: [{'tkt_number': str, 'entry_time': datetime}, ...]（入園時間は必須）
+
+        Returns:
+            list: 入力と同じ順序の [(判定結果 dict, EntryLog), ...]
+        """
+        if not scans:
+            return []
+
+        # 当日以外の日付を含む場合、対象日のOK入場回数を1回の問い合わせで取得
+        today = date.today()
+        holders = {
+            scan['tkt_number']: EntryJudgementService._holder_tickets(scan['tkt_number'])
+            for scan in scans
+        }
+        counts = EntryJudgementService._count_entries_by_date(
+            {number for numbers in holders.values() for number in numbers},
+            {scan['entry_time'].date() for scan in scans} - {today}
+        )
+
+        # 入園時間順に判定（同時刻は入力順）
+        order = sorted(range(len(scans)), key=lambda i: scans[i]['entry_time'])
+        results = [None] * len(scans)
+        logs = []
+
+        for i in order:
+            scan = scans[i]
+            tkt_number = scan['tkt_number']
+            on_date = scan['entry_time'].date()
+
+            def count_entries(number, on_date=on_date):
+                base = EntryJudgementService._count_today_entries(number) if on_date == today else 0
+                return base + sum(counts.get((holder, on_date), 0) for holder in holders[number])
+
+            judgement = EntryJudgementService._decide(tkt_number, on_date, count_entries)
+
+            # バッチ内の先行スキャンも再入場判定に反映
+            if judgement['result'] == 'OK':
+                counts[(tkt_number, on_date)] = counts.get((tkt_number, on_date), 0) + 1
+
+            entry_log = EntryLog(
+                tkt_number=tkt_number,
+                entry_time=scan['entry_time'],
+                result=judgement['result'],
+                comment=judgement['comment'],
+                is_reentry=judgement['is_reentry']
+            )
+            logs.append(entry_log)
+            results[i] = (judgement, entry_log)
+
+        db.session.add_all(logs)
+        AttendanceStatsService.add_logs(logs)
+        db.session.commit()
+
+        for entry_log in logs:
+            today_entry_counter.add(entry_log.tkt_number, entry_log.entry_time, entry_log.result)
+        entry_feed.notify()
+
+        return results
+
+    @staticmethod
+    def _count_entries_by_date(tkt_numbers, dates):
+        """指定TKT番号・指定日ごとのOK入場回数を集計 {(tkt_number, date): count}"""
+        if not tkt_numbers or not dates:
+            return {}
+
+        range_start = datetime.combine(min(dates), datetime.min.time())
+        range_end = datetime.combine(max(dates) + timedelta(days=1), datetime.min.time())
+
+        rows = EntryLog.query.with_entities(
+            EntryLog.tkt_number,
+            EntryLog.entry_time
+        ).filter(
+            EntryLog.tkt_number.in_(tkt_numbers),
+            EntryLog.entry_time >= range_start,
+            EntryLog.entry_time < range_end,
+            EntryLog.result == 'OK'
+        ).all()
+
+        counts = {}
+        for tkt_number, entry_time in rows:
+            key = (tkt_number, entry_time.date())
+            if key[1] in dates:
+                counts[key] = counts.get(key, 0) + 1
+
+        return counts
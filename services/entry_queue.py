@@ -0,0 +1,268 @@
+"""入園履歴の非同期書き込み（ライトビハインド）キュー
+
+判定結果はローカルのジャーナルファイル（JSON Lines）に追記した時点で確定とし、
+バックグラウンドのライターが一定間隔でまとめて entry_logs に書き込む。
+ジャーナルは一定間隔で切り替え（セグメント）、DBへのコミット後に削除する。
+異常終了で残ったセグメントは次回起動時に取り込む（少なくとも1回の書き込みを保証）。
+データの不備で書き込めない履歴は、ENTRY_QUEUE_MAX_RETRIES 回失敗した時点で1件ずつ書き込み直し、
+失敗した行だけを rejected.jsonl に移して後続のセグメントの書き込みを止めない。
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import OperationalError
+from models.entry_log import EntryLog
+from database import db
+from database.engine import retry_on_lock
+from services.entry_feed import entry_feed
+from services.attendance_stats import AttendanceStatsService
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class _Segment:
+    """ジャーナルの1ファイル分（書き込み中は排他ロックを保持する）"""
+
+    def __init__(self, path, fsync):
+        self.path = path
+        self.fsync = fsync
+        self.rows = []
+        self.failures = 0  # DBへの書き込みに失敗した回数
+        self.file = open(path, 'a', encoding='utf-8')
+        if fcntl:
+            try:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # 別ワーカーがロックを保持している（開いたファイルは閉じてから知らせる）
+                self.file.close()
+                raise
+
+    def append(self, row):
+        self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.rows.append(row)
+
+    def discard(self):
+        """DBへの書き込み完了後にファイルを削除"""
+        try:
+            os.remove(self.path)
+        finally:
+            self.file.close()
+
+
+class EntryWriteQueue:
+    """入園履歴のライトビハインドキュー"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._active = None
+        self._sealed = []
+        self._thread = None
+        self._app = None
+        self._sequence = 0
+        self.enabled = False
+
+    def start(self, app):
+        """ライターを開始し、前回残ったセグメントを取り込む（当日入場カウンタの読み込みより前に呼び出す）"""
+        if self.enabled:
+            return
+
+        self._app = app
+        self._directory = app.config['ENTRY_QUEUE_DIR']
+        self._interval = app.config.get('ENTRY_QUEUE_FLUSH_INTERVAL', 0.5)
+        self._batch_size = app.config.get('ENTRY_QUEUE_BATCH_SIZE', 500)
+        self._max_retries = app.config.get('ENTRY_QUEUE_MAX_RETRIES', 5)
+        self._fsync = app.config.get('ENTRY_QUEUE_FSYNC', True)
+        os.makedirs(self._directory, exist_ok=True)
+
+        with app.app_context():
+            self.recover()
+
+        self._active = self._open_segment()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='entry-writer', daemon=True)
+        self._thread.start()
+        self.enabled = True
+        atexit.register(self.stop)
+
+    def enqueue(self, tkt_number, entry_time, result, comment, is_reentry):
+        """入園履歴をジャーナルに追記する（DBへの書き込みは後で行う）"""
+        row = {
+            'tkt_number': tkt_number,
+            'entry_time': entry_time.isoformat(),
+            'result': result,
+            'comment': comment,
+            'is_reentry': bool(is_reentry),
+            'created_at': datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            self._active.append(row)
+            pending = len(self._active.rows)
+
+        if pending >= self._batch_size:
+            self._wakeup.set()
+
+    def pending_count(self):
+        """DB未反映の件数"""
+        with self._lock:
+            return len(self._active.rows if self._active else []) + sum(len(s.rows) for s in self._sealed)
+
+    def pending_rows(self):
+        """DB未反映の履歴（ジャーナルに追記した行の複製）"""
+        with self._lock:
+            rows = list(self._active.rows) if self._active else []
+            for segment in self._sealed:
+                rows.extend(segment.rows)
+        return rows
+
+    def stop(self):
+        """ライターを停止し、キューに残った履歴をすべてDBへ書き込む"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join()
+        with self._app.app_context():
+            self._rotate()
+            self._flush_sealed()
+        if self._active:
+            self._active.discard()
+            self._active = None
+
+    def recover(self):
+        """他プロセスが保持していない残存セグメントをDBへ取り込む（アプリケーションコンテキスト内で呼び出す）"""
+        recovered = 0
+        for path in sorted(glob.glob(os.path.join(self._directory, 'entries-*.jsonl'))):
+            try:
+                segment = _Segment(path, fsync=False)
+            except OSError:
+                # 稼働中の別ワーカーが書き込み中
+                continue
+
+            with open(path, encoding='utf-8') as journal:
+                for line in journal:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        segment.rows.append(json.loads(line))
+                    except ValueError:
+                        # 書き込み途中で終了した末尾の行
+                        continue
+
+            if segment.rows:
+                recovered += len(segment.rows)
+                # 前回の起動時から失敗し続けている可能性があるため、失敗した行はすぐに取り除く
+                self._write_segment(segment, max_retries=1)
+            segment.discard()
+
+        return recovered
+
+    def _open_segment(self):
+        """新しいセグメントを作成"""
+        self._sequence += 1
+        name = f'entries-{os.getpid()}-{int(time.time() * 1000)}-{self._sequence}.jsonl'
+        return _Segment(os.path.join(self._directory, name), self._fsync)
+
+    def _rotate(self):
+        """書き込み中のセグメントを確定し、新しいセグメントに切り替える"""
+        with self._lock:
+            if not self._active or not self._active.rows:
+                return
+            self._sealed.append(self._active)
+            self._active = self._open_segment() if not self._stopping.is_set() else None
+
+    def _run(self):
+        """一定間隔、または件数が溜まった時点でDBへ書き込む"""
+        while not self._stopping.is_set():
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            try:
+                with self._app.app_context():
+                    self._rotate()
+                    self._flush_sealed()
+            except Exception as e:
+                # セグメントは残るため、次回に再試行される
+                self._app.logger.error(f'入園履歴の書き込みに失敗しました: {e}')
+
+    def _flush_sealed(self):
+        """確定済みセグメントを古い順にDBへ書き込む"""
+        while self._sealed:
+            segment = self._sealed[0]
+            self._write_segment(segment, self._max_retries)
+            with self._lock:
+                self._sealed.pop(0)
+            segment.discard()
+            entry_feed.notify()
+
+    def _write_segment(self, segment, max_retries):
+        """セグメントをDBへ書き込む（max_retries 回失敗した場合は1件ずつ書き込み、失敗した行を取り除く）"""
+        try:
+            self._write_rows(segment.rows)
+            return
+        except OperationalError:
+            # DBに接続できない・ロック待ちの上限など。セグメントを残して次回に再試行する
+            db.session.rollback()
+            raise
+        except Exception:
+            db.session.rollback()
+            segment.failures += 1
+            if segment.failures < max_retries:
+                raise
+
+        while segment.rows:
+            row = segment.rows[0]
+            try:
+                self._write_rows([row])
+            except OperationalError:
+                db.session.rollback()
+                raise
+            except Exception as e:
+                db.session.rollback()
+                self._reject(row, e)
+            # 書き込んだ（または取り除いた）行は再試行時に重複させない
+            segment.rows.pop(0)
+
+    def _reject(self, row, error):
+        """書き込めない履歴を rejected.jsonl に移す"""
+        record = dict(row, error=str(error), rejected_at=datetime.utcnow().isoformat())
+        with open(os.path.join(self._directory, 'rejected.jsonl'), 'a', encoding='utf-8') as rejected:
+            rejected.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._app.logger.error(f'入園履歴を書き込めないため rejected.jsonl に移しました: {record}')
+
+    @staticmethod
+    @retry_on_lock
+    def _write_rows(rows):
+        """1トランザクションで一括INSERT"""
+        logs = [
+            EntryLog(
+                tkt_number=row['tkt_number'],
+                entry_time=datetime.fromisoformat(row['entry_time']),
+                result=row['result'],
+                comment=row['comment'],
+                is_reentry=row['is_reentry'],
+                created_at=datetime.fromisoformat(row['created_at'])
+            )
+            for row in rows
+        ]
+        db.session.add_all(logs)
+        AttendanceStatsService.add_logs(logs)
+        db.session.commit()
+        return logs
+
+
+# アプリケーション全体で共有するキュー
+entry_write_queue = EntryWriteQueue()
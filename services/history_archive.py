@@ -0,0 +1,283 @@
+"""入園履歴のアーカイブ（月単位のパーティション）
+
+保持期間（ARCHIVE_AFTER_DAYS）より古い月の入園履歴を entry_logs から移動し、
+entry_logs を当面参照される範囲だけに保つ。アーカイブ先は次のいずれか。
+
+- table: 同じデータベース内の月別テーブル entry_logs_YYYYMM
+- gzip: ARCHIVE_DIR 内の圧縮ファイル entry_logs_YYYYMM.jsonl.gz（入園時間・IDの降順）
+
+一覧・エクスポートは期間（date_from/date_to）の指定がアーカイブ済みの月に及ぶ場合のみ、
+該当する月のアーカイブを参照して結果に含める。アーカイブ済みの履歴は参照専用。
+"""
+import gzip
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, DateTime, Boolean, Text, Index,
+    select, delete, func
+)
+from models.entry_log import EntryLog
+from models.entry_log_archive import EntryLogArchive
+from database import db
+from database.engine import retry_on_lock
+from services.history_query import HistoryQueryService
+from services.data_versions import DataVersionService, ENTRY_LOGS
+
+# アーカイブ用テーブルの定義（db.create_all() の対象外とする）
+_archive_metadata = MetaData()
+
+# 履歴の列（entry_logs と同じ順）
+COLUMNS = ['id', 'tkt_number', 'entry_time', 'result', 'comment', 'is_reentry', 'created_at']
+
+# 圧縮アーカイブから読み込んだ履歴
+ArchivedEntry = namedtuple('ArchivedEntry', COLUMNS)
+
+
+class HistoryArchiveService:
+    """入園履歴アーカイブサービス"""
+
+    # ---- アーカイブの作成 ----
+
+    @staticmethod
+    def default_cutoff(today=None):
+        """保持期間より前の月初（この日より前の月をアーカイブ対象とする）"""
+        today = today or date.today()
+        boundary = today - timedelta(days=current_app.config['ARCHIVE_AFTER_DAYS'])
+        return boundary.replace(day=1)
+
+    @staticmethod
+    def archive(cutoff=None, storage=None):
+        """
+        cutoff より前の入園履歴を月単位でアーカイブする（アプリケーションコンテキスト内で呼び出す）
+
+        Args:
+            cutoff: この日付より前の月が対象（月初に切り捨て。省略時は保持期間から算出）
+            storage: 'table' または 'gzip'（省略時は ARCHIVE_STORAGE）
+
+        Returns:
+            list: [{'month': 'YYYY-MM', 'row_count': 移動件数, 'storage': str}, ...]
+        """
+        cutoff = (cutoff or HistoryArchiveService.default_cutoff()).replace(day=1)
+        storage = storage or current_app.config['ARCHIVE_STORAGE']
+        if storage not in ('table', 'gzip'):
+            raise ValueError('storage は table または gzip を指定してください')
+
+        oldest = EntryLog.query.with_entities(func.min(EntryLog.entry_time)).filter(
+            EntryLog.entry_time < datetime.combine(cutoff, datetime.min.time())
+        ).scalar()
+        if oldest is None:
+            return []
+
+        archived = []
+        month_start = oldest.date().replace(day=1)
+        while month_start < cutoff:
+            month_end = (month_start + timedelta(days=32)).replace(day=1)
+            moved = HistoryArchiveService._archive_month(month_start, month_end, storage)
+            if moved:
+                archived.append({'month': month_start.strftime('%Y-%m'), 'row_count': moved, 'storage': storage})
+            month_start = month_end
+
+        return archived
+
+    @staticmethod
+    @retry_on_lock
+    def _archive_month(month_start, month_end, storage):
+        """1か月分を1トランザクションで移動"""
+        month = month_start.strftime('%Y-%m')
+        range_start = datetime.combine(month_start, datetime.min.time())
+        range_end = datetime.combine(month_end, datetime.min.time())
+        live = EntryLog.__table__
+        in_month = (live.c.entry_time >= range_start) & (live.c.entry_time < range_end)
+
+        row_count, min_id, max_id = db.session.execute(
+            select(func.count(), func.min(live.c.id), func.max(live.c.id)).where(in_month)
+        ).one()
+        if not row_count:
+            return 0
+
+        record = db.session.get(EntryLogArchive, month)
+        if record and record.storage != storage:
+            # 既存のアーカイブと同じ形式に追加する
+            storage = record.storage
+
+        if storage == 'table':
+            table = HistoryArchiveService._table(HistoryArchiveService._table_name(month_start))
+            table.create(db.session.connection(), checkfirst=True)
+            db.session.execute(table.insert().from_select(
+                COLUMNS,
+                select(*[live.c[name] for name in COLUMNS]).where(in_month)
+            ))
+            location = table.name
+        else:
+            location = HistoryArchiveService._write_file(month_start, in_month, record)
+
+        db.session.execute(delete(live).where(in_month))
+
+        if record is None:
+            record = EntryLogArchive(
+                month=month,
+                storage=storage,
+                location=location,
+                period_start=month_start,
+                period_end=month_end,
+                row_count=0
+            )
+            db.session.add(record)
+        record.row_count = (record.row_count or 0) + row_count
+        record.min_id = min_id if record.min_id is None else min(record.min_id, min_id)
+        record.max_id = max_id if record.max_id is None else max(record.max_id, max_id)
+        DataVersionService.bump(ENTRY_LOGS)
+        db.session.commit()
+
+        return row_count
+
+    @staticmethod
+    def _write_file(month_start, in_month, record):
+        """月の履歴を（既存の圧縮ファイルと合わせて）入園時間・IDの降順で書き出す"""
+        directory = current_app.config['ARCHIVE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{HistoryArchiveService._table_name(month_start)}.jsonl.gz")
+
+        live = EntryLog.__table__
+        rows = {
+            row.id: row
+            for row in db.session.execute(select(*[live.c[name] for name in COLUMNS]).where(in_month))
+        }
+        if record is not None and os.path.exists(record.location):
+            # 前回の書き出し後に中断していた場合の重複はIDで除く
+            for row in HistoryArchiveService._read_file(record.location):
+                rows.setdefault(row.id, row)
+
+        ordered = sorted(rows.values(), key=lambda row: (row.entry_time, row.id), reverse=True)
+
+        temp_path = path + '.tmp'
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as archive_file:
+            for row in ordered:
+                archive_file.write(json.dumps({
+                    'id': row.id,
+                    'tkt_number': row.tkt_number,
+                    'entry_time': row.entry_time.isoformat(),
+                    'result': row.result,
+                    'comment': row.comment,
+                    'is_reentry': bool(row.is_reentry),
+                    'created_at': row.created_at.isoformat() if row.created_at else None
+                }, ensure_ascii=False) + '\n')
+        with open(temp_path, 'rb') as written:
+            os.fsync(written.fileno())
+        os.replace(temp_path, path)
+
+        return path
+
+    # ---- アーカイブの参照 ----
+
+    @staticmethod
+    def _table_name(month_start):
+        return f"entry_logs_{month_start.strftime('%Y%m')}"
+
+    @staticmethod
+    def _table(name):
+        """月別アーカイブテーブルの定義"""
+        if name in _archive_metadata.tables:
+            return _archive_metadata.tables[name]
+        return Table(
+            name, _archive_metadata,
+            Column('id', Integer, primary_key=True),
+            Column('tkt_number', String(10), nullable=False),
+            Column('entry_time', DateTime, nullable=False),
+            Column('result', String(5), nullable=False),
+            Column('comment', Text, nullable=True),
+            Column('is_reentry', Boolean, default=False),
+            Column('created_at', DateTime),
+            Index(f'ix_{name}_entry_time_id', 'entry_time', 'id'),
+            Index(f'ix_{name}_tkt_number_entry_time', 'tkt_number', 'entry_time')
+        )
+
+    @staticmethod
+    def _read_file(path):
+        """圧縮アーカイブの履歴を先頭（新しい順）から読み込む"""
+        with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+            for line in archive_file:
+                row = json.loads(line)
+                row['entry_time'] = datetime.fromisoformat(row['entry_time'])
+                if row['created_at']:
+                    row['created_at'] = datetime.fromisoformat(row['created_at'])
+                yield ArchivedEntry(**row)
+
+    @staticmethod
+    def archived_until():
+        """アーカイブ済み期間の終了日の翌日（アーカイブがない場合はNone）"""
+        return EntryLogArchive.query.with_entities(func.max(EntryLogArchive.period_end)).scalar()
+
+    @staticmethod
+    def archives_for(filters):
+        """期間の指定に該当するアーカイブ（新しい月から順）。期間の指定がない場合は対象外"""
+        if 'date_from' not in filters and 'date_to' not in filters:
+            return []
+
+        query = EntryLogArchive.query
+        if 'date_from' in filters:
+            query = query.filter(EntryLogArchive.period_end > filters['date_from'])
+        if 'date_to' in filters:
+            query = query.filter(EntryLogArchive.period_start <= filters['date_to'])
+        return query.order_by(EntryLogArchive.period_start.desc()).all()
+
+    @staticmethod
+    def iter_rows(record, filters, cursor=None, limit=None):
+        """アーカイブ1か月分の履歴を入園時間・IDの降順で返す"""
+        if record.storage == 'gzip':
+            filters = HistoryQueryService.resolve(filters)
+            count = 0
+            for row in HistoryArchiveService._read_file(record.location):
+                if limit is not None and count >= limit:
+                    return
+                if HistoryQueryService.matches(row, filters, cursor):
+                    count += 1
+                    yield row
+            return
+
+        table = HistoryArchiveService._table(record.location)
+        query = select(*[table.c[name] for name in COLUMNS])
+        query = HistoryQueryService.apply_filters(query, filters, source=table.c)
+        if cursor:
+            query = HistoryQueryService.apply_cursor(query, cursor, source=table.c)
+        query = query.order_by(table.c.entry_time.desc(), table.c.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+            yield from db.session.execute(query)
+        else:
+            yield from db.session.execute(
+                query.execution_options(yield_per=current_app.config.get('EXPORT_BATCH_SIZE', 1000))
+            )
+
+    @staticmethod
+    def fetch_page(filters, cursor, limit):
+        """一覧の1ページ分に含まれ得るアーカイブ済み履歴（各月から最大 limit 件、EntryLog として返す）"""
+        logs = []
+        for record in HistoryArchiveService.archives_for(filters):
+            for row in HistoryArchiveService.iter_rows(record, filters, cursor, limit):
+                logs.append(EntryLog(**{name: getattr(row, name) for name in COLUMNS}))
+        return logs
+
+    @staticmethod
+    def get(log_id):
+        """IDからアーカイブ済みの履歴を取得（EntryLog として返す。見つからない場合はNone）"""
+        records = EntryLogArchive.query.filter(
+            EntryLogArchive.min_id <= log_id,
+            EntryLogArchive.max_id >= log_id
+        ).all()
+
+        for record in records:
+            if record.storage == 'gzip':
+                row = next((row for row in HistoryArchiveService._read_file(record.location) if row.id == log_id), None)
+            else:
+                table = HistoryArchiveService._table(record.location)
+                row = db.session.execute(
+                    select(*[table.c[name] for name in COLUMNS]).where(table.c.id == log_id)
+                ).first()
+            if row is not None:
+                return EntryLog(**{name: getattr(row, name) for name in COLUMNS})
+
+        return None
@@ -0,0 +1,152 @@
+"""入園履歴の一括訂正・削除
+
+対象はIDのリスト、または一覧APIと同じ検索条件（期間・TKT番号・判定結果・再入場）で指定する。
+変更は1つの UPDATE / DELETE 文で行い、対象の日付の入園集計も同じトランザクションで作り直す。
+当日入場カウンタの読み込み直しとリアルタイム配信の集計の作り直しは、コミット後に1回だけ行う。
+アーカイブ済みの履歴は読み取り専用のため対象に含めない。
+"""
+from sqlalchemy import select, update, delete
+from flask import current_app
+from models.entry_log import EntryLog
+from database import db
+from database.engine import retry_on_lock
+from services.history_query import HistoryQueryService
+from services.attendance_stats import AttendanceStatsService
+from services.entry_counter import today_entry_counter
+from services.entry_feed import entry_feed
+from services.cache_coherence import cache_coherence
+from services.data_versions import DataVersionService, ENTRY_LOGS
+
+# 一括操作の種類
+ACTIONS = ('update', 'delete')
+
+# 一括訂正で変更できる項目（入園時間・TKT番号は1件ずつ編集する）
+UPDATABLE_FIELDS = ('result', 'is_reentry', 'comment')
+
+
+class HistoryBulkService:
+    """入園履歴一括操作サービス"""
+
+    @staticmethod
+    def parse_request(data):
+        """
+        一括操作のリクエストを解析
+
+        Args:
+            data: {
+                'action': 'update' | 'delete',
+                'ids': [履歴ID, ...] または 'filter': {一覧APIと同じ検索条件},
+                'values': {'result', 'is_reentry', 'comment' のいずれか}（update）,
+                'dry_run': bool
+            }
+
+        Returns:
+            tuple: (params dict, エラーメッセージ or None)
+        """
+        if not isinstance(data, dict):
+            return None, 'リクエストの形式が不正です'
+
+        action = data.get('action')
+        if action not in ACTIONS:
+            return None, f"action には {', '.join(ACTIONS)} のいずれかを指定してください"
+        params = {'action': action, 'dry_run': bool(data.get('dry_run', False))}
+
+        # 対象の指定（IDのリストまたは検索条件のどちらか一方）
+        has_ids = data.get('ids') is not None
+        has_filter = data.get('filter') is not None
+        if has_ids == has_filter:
+            return None, 'ids または filter のどちらか一方を指定してください'
+
+        if has_ids:
+            ids = data['ids']
+            if not isinstance(ids, list) or not ids:
+                return None, 'ids に履歴IDの配列を指定してください'
+            if any(isinstance(log_id, bool) or not isinstance(log_id, int) for log_id in ids):
+                return None, 'ids には整数の履歴IDを指定してください'
+            max_size = current_app.config['BULK_MAX_LOG_IDS']
+            if len(ids) > max_size:
+                return None, f'一度に指定できる履歴IDは{max_size}件までです'
+            params['ids'] = sorted(set(ids))
+        else:
+            if not isinstance(data['filter'], dict):
+                return None, 'filter には検索条件のオブジェクトを指定してください'
+            # クエリパラメータと同じ文字列として解析する
+            args = {
+                key: ('true' if value else 'false') if isinstance(value, bool) else str(value)
+                for key, value in data['filter'].items() if value is not None
+            }
+            filters, error = HistoryQueryService.parse_filters(args)
+            if error:
+                return None, error
+            if not filters:
+                # 全件を対象にする誤操作を防ぐ
+                return None, 'filter に1つ以上の検索条件を指定してください'
+            params['filters'] = filters
+
+        if action == 'update':
+            values = data.get('values')
+            if not isinstance(values, dict) or not values:
+                return None, f"values に {', '.join(UPDATABLE_FIELDS)} のいずれかを指定してください"
+            unknown = sorted(set(values) - set(UPDATABLE_FIELDS))
+            if unknown:
+                return None, f"values で変更できない項目です: {', '.join(unknown)}"
+            if 'result' in values and values['result'] not in ('OK', 'NG'):
+                return None, 'result は OK または NG を指定してください'
+            if 'is_reentry' in values and not isinstance(values['is_reentry'], bool):
+                return None, 'is_reentry は true または false を指定してください'
+            if 'comment' in values and values['comment'] is not None and not isinstance(values['comment'], str):
+                return None, 'comment には文字列を指定してください'
+            params['values'] = dict(values)
+
+        return params, None
+
+    @staticmethod
+    def _selection(params):
+        """対象の入園履歴のIDを返すSELECT（アーカイブ済みの履歴は entry_logs に無いため含まれない）"""
+        query = select(EntryLog.id)
+        if 'ids' in params:
+            return query.where(EntryLog.id.in_(params['ids']))
+        return HistoryQueryService.apply_filters(query, params['filters'])
+
+    @staticmethod
+    @retry_on_lock
+    def execute(params):
+        """一括操作を実行（dry_run の場合は対象件数のみ返す）"""
+        selection = HistoryBulkService._selection(params)
+        rows = db.session.execute(
+            select(EntryLog.entry_time).where(EntryLog.id.in_(selection))
+        ).all()
+
+        action = params['action']
+        result = {'action': action, 'dry_run': params['dry_run'], 'matched': len(rows)}
+        result['deleted' if action == 'delete' else 'updated'] = 0
+        if 'ids' in params:
+            # 存在しない、またはアーカイブ済みの履歴ID
+            result['not_found'] = len(params['ids']) - len(rows)
+        if params['dry_run'] or not rows:
+            db.session.rollback()
+            return result
+
+        if action == 'delete':
+            count = db.session.execute(
+                delete(EntryLog).where(EntryLog.id.in_(selection)),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+        else:
+            count = db.session.execute(
+                update(EntryLog).where(EntryLog.id.in_(selection)).values(**params['values']),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+        # 対象の日付の集計を同じトランザクションで作り直す
+        AttendanceStatsService.rebuild(dates={row.entry_time.date() for row in rows}, commit=False)
+        DataVersionService.bump(ENTRY_LOGS)
+        db.session.commit()
+
+        # 当日分に変更があればカウンタを1回だけ読み込み直す
+        today = today_entry_counter.today()
+        if any(today_entry_counter.business_date_of(row.entry_time) == today for row in rows):
+            cache_coherence.reload_counter()
+        entry_feed.invalidate()
+
+        result['deleted' if action == 'delete' else 'updated'] = count
+        return result
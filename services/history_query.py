@@ -0,0 +1,124 @@
+import base64
+from datetime import datetime, timedelta
+from sqlalchemy import tuple_, Select
+from models.entry_log import EntryLog
+from database import db
+
+
+class HistoryQueryService:
+    """入園履歴の検索条件サービス（一覧・エクスポート共通）"""
+
+    @staticmethod
+    def parse_filters(args):
+        """
+        クエリパラメータから検索条件を取り出す
+
+        Args:
+            args: request.args
+
+        Returns:
+            tuple: (filters dict, エラーメッセージ or None)
+        """
+        filters = {}
+
+        tkt_number = (args.get('tkt_number') or '').strip()
+        if tkt_number:
+            filters['tkt_number'] = tkt_number
+
+        for key in ('date_from', 'date_to'):
+            value = args.get(key)
+            if not value:
+                continue
+            try:
+                filters[key] = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                return None, f'{key} は YYYY-MM-DD 形式で指定してください'
+
+        result = args.get('result')
+        if result:
+            if result not in ('OK', 'NG'):
+                return None, 'result は OK または NG を指定してください'
+            filters['result'] = result
+
+        is_reentry = args.get('is_reentry')
+        if is_reentry:
+            if is_reentry.lower() not in ('true', 'false', '1', '0'):
+                return None, 'is_reentry は true または false を指定してください'
+            filters['is_reentry'] = is_reentry.lower() in ('true', '1')
+
+        return filters, None
+
+    @staticmethod
+    def apply_filters(query, filters, source=EntryLog):
+        """検索条件をクエリに適用（source にはアーカイブテーブルの列 table.c も指定できる）"""
+        if 'tkt_number' in filters:
+            query = query.filter(source.tkt_number == filters['tkt_number'])
+
+        if 'tkt_numbers' in filters:
+            # 振替の系譜など複数のTKT番号（クエリパラメータからは指定しない。TKT番号を返すSELECTも指定できる）
+            query = query.filter(source.tkt_number.in_(filters['tkt_numbers']))
+
+        if 'date_from' in filters:
+            query = query.filter(source.entry_time >= datetime.combine(filters['date_from'], datetime.min.time()))
+
+        if 'date_to' in filters:
+            # 終了日は当日分を含める
+            day_after = datetime.combine(filters['date_to'] + timedelta(days=1), datetime.min.time())
+            query = query.filter(source.entry_time < day_after)
+
+        if 'result' in filters:
+            query = query.filter(source.result == filters['result'])
+
+        if 'is_reentry' in filters:
+            query = query.filter(source.is_reentry == filters['is_reentry'])
+
+        return query
+
+    @staticmethod
+    def resolve(filters):
+        """メモリ上で絞り込めるよう、SELECTで指定したTKT番号を集合に置き換えた検索条件を返す"""
+        tkt_numbers = filters.get('tkt_numbers')
+        if isinstance(tkt_numbers, Select):
+            filters = dict(filters, tkt_numbers=set(db.session.execute(tkt_numbers).scalars()))
+        return filters
+
+    @staticmethod
+    def matches(log, filters, cursor=None):
+        """検索条件・ページ位置に一致するか（圧縮アーカイブをメモリ上で絞り込む場合に使用）"""
+        if 'tkt_number' in filters and log.tkt_number != filters['tkt_number']:
+            return False
+        if 'tkt_numbers' in filters and log.tkt_number not in filters['tkt_numbers']:
+            return False
+        if 'date_from' in filters and log.entry_time.date() < filters['date_from']:
+            return False
+        if 'date_to' in filters and log.entry_time.date() > filters['date_to']:
+            return False
+        if 'result' in filters and log.result != filters['result']:
+            return False
+        if 'is_reentry' in filters and bool(log.is_reentry) != filters['is_reentry']:
+            return False
+        if cursor and (log.entry_time, log.id) >= cursor:
+            return False
+        return True
+
+    @staticmethod
+    def encode_cursor(entry_time, log_id):
+        """ページ末尾の (入園時間, ID) をカーソル文字列に変換"""
+        raw = f'{entry_time.isoformat()}|{log_id}'
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """カーソル文字列を (入園時間, ID) に変換（不正な場合はNone）"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+            entry_time, log_id = raw.split('|')
+            return datetime.fromisoformat(entry_time), int(log_id)
+        except (ValueError, UnicodeError):
+            return None
+
+    @staticmethod
+    def apply_cursor(query, cursor, source=EntryLog):
+        """キーセット方式のページ位置を適用（入園時間・IDの降順）"""
+        entry_time, log_id = cursor
+        return query.filter(tuple_(source.entry_time, source.id) < (entry_time, log_id))
@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from models.import_job import ImportJob
+from database import db
+from services.ticket_import import TicketImportService
+
+
+class ImportJobService:
+    """CSV一括登録のバックグラウンドジョブ管理サービス
+
+    ジョブの状態はデータベースに保存するため、どのワーカープロセスからでも参照できる。
+    """
+
+    @staticmethod
+    def start(app, file_storage):
+        """
+        アップロードファイルを保存し、バックグラウンドで一括登録を開始する
+
+        Args:
+            app: Flaskアプリケーション
+            file_storage: アップロードされたファイル（werkzeug FileStorage）
+
+        Returns:
+            ImportJob: 作成したジョブ
+        """
+        job_id = uuid.uuid4().hex
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        path = os.path.join(app.config['UPLOAD_FOLDER'], f'import_{job_id}.csv')
+        file_storage.save(path)
+
+        job = ImportJob(id=job_id, filename=file_storage.filename, status='queued')
+        db.session.add(job)
+        db.session.commit()
+
+        thread = threading.Thread(
+            target=ImportJobService._run,
+            args=(app, job_id, path),
+            name=f'import-{job_id[:8]}',
+            daemon=True
+        )
+        thread.start()
+
+        return job
+
+    @staticmethod
+    def get(job_id):
+        """ジョブを取得（存在しない場合はNone）"""
+        return db.session.get(ImportJob, job_id)
+
+    @staticmethod
+    def _run(app, job_id, path):
+        """ワーカースレッドで一括登録を実行"""
+        with app.app_context():
+            pause = app.config.get('IMPORT_CHUNK_PAUSE', 0)
+            max_errors = app.config.get('IMPORT_PROGRESS_ERRORS', 100)
+
+            def progress(result):
+                ImportJobService._save_progress(job_id, result, 'running', max_errors)
+                # チャンク間で書き込みロックを手放し、入場判定の記録を優先させる
+                if pause:
+                    time.sleep(pause)
+
+            try:
+                ImportJobService._update(job_id, status='running')
+                with open(path, 'rb') as stream:
+                    result = TicketImportService.import_csv(
+                        stream,
+                        chunk_size=app.config.get('IMPORT_CHUNK_SIZE'),
+                        progress=progress
+                    )
+                ImportJobService._save_progress(job_id, result, 'completed')
+
+            except Exception as e:
+                db.session.rollback()
+                ImportJobService._update(
+                    job_id,
+                    status='failed',
+                    message=f'CSV読み込みエラー: {str(e)}',
+                    finished_at=datetime.utcnow()
+                )
+
+            finally:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                db.session.remove()
+
+    @staticmethod
+    def _save_progress(job_id, result, status, max_errors=None):
+        """処理結果をジョブに保存"""
+        errors = result['errors'] if max_errors is None else result['errors'][:max_errors]
+        values = {
+            'status': status,
+            'total_rows': result['total_rows'],
+            'success_count': result['success_count'],
+            'error_count': result['error_count'],
+            'errors': json.dumps(errors, ensure_ascii=False),
+            'elapsed_seconds': result['elapsed_seconds'],
+            'rows_per_second': result['rows_per_second']
+        }
+        if status == 'completed':
+            values['message'] = f"読み込み完了 成功: {result['success_count']}件 エラー: {result['error_count']}件"
+            values['finished_at'] = datetime.utcnow()
+
+        ImportJobService._update(job_id, **values)
+
+    @staticmethod
+    def _update(job_id, **values):
+        """ジョブの状態を更新"""
+        job = db.session.get(ImportJob, job_id)
+        if not job:
+            return
+        for key, value in values.items():
+            setattr(job, key, value)
+        db.session.commit()
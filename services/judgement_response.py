@@ -0,0 +1,95 @@
+"""入場判定のコンパクトレスポンス
+
+ゲート画面が表示する項目（判定結果・コメント・券種・性別・年齢・有効期限）だけを返す。
+チケットごとのJSON断片はチケットインデックスのエントリ単位で事前生成してキャッシュし、
+判定のたびに辞書を組み立ててシリアライズする処理を省く。
+"""
+import json
+import threading
+
+# コンパクトレスポンスを要求するAcceptヘッダのメディアタイプ
+COMPACT_MEDIA_TYPE = 'application/vnd.kana.judgement-compact+json'
+
+
+class CompactJudgementSerializer:
+    """入場判定結果のコンパクトなJSONシリアライザ"""
+
+    def __init__(self):
+        # TKT番号 → (インデックスのエントリ, JSON断片)
+        self._fragments = {}
+        # コメント文字列 → JSON断片（判定コメントは数種類のみ）
+        self._comments = {}
+        self._lock = threading.Lock()
+
+    def _ticket_fragment(self, entry):
+        """チケット部分のJSON断片（エントリが差し替えられた場合のみ再生成）"""
+        if entry is None:
+            return 'null'
+
+        cached = self._fragments.get(entry.tkt_number)
+        if cached is not None and cached[0] is entry:
+            return cached[1]
+
+        fragment = json.dumps({
+            'ticket_type': entry.ticket_type,
+            'gender': entry.gender,
+            'age': entry.age,
+            'expiry_date': entry.expiry_date.isoformat() if entry.expiry_date else None
+        }, ensure_ascii=False, separators=(',', ':'))
+
+        with self._lock:
+            self._fragments[entry.tkt_number] = (entry, fragment)
+        return fragment
+
+    def _comment_fragment(self, comment):
+        """コメント部分のJSON断片"""
+        fragment = self._comments.get(comment)
+        if fragment is None:
+            fragment = json.dumps(comment, ensure_ascii=False)
+            with self._lock:
+                self._comments[comment] = fragment
+        return fragment
+
+    def serialize(self, tkt_number, judgement, entry_time):
+        """
+        判定結果をコンパクトなJSON文字列に変換
+
+        Args:
+            tkt_number: TKT番号（バリデーション済み）
+            judgement: EntryJudgementService.judge(..., ticket_dict=False) の結果
+            entry_time: 入園時間
+
+        Returns:
+            str: {"result","comment","valid","is_reentry","tkt_number","entry_time","ticket"} のJSON
+                 （登録なしの場合は "suggestions" を含む）
+        """
+        return (
+            '{"result":"' + judgement['result'] + '"'
+            ',"comment":' + self._comment_fragment(judgement['comment']) +
+            ',"valid":' + ('true' if judgement['valid'] else 'false') +
+            ',"is_reentry":' + ('true' if judgement['is_reentry'] else 'false') +
+            ',"tkt_number":' + json.dumps(tkt_number) +
+            ',"entry_time":"' + entry_time.isoformat(timespec='seconds') + '"'
+            ',"ticket":' + self._ticket_fragment(judgement['ticket']) +
+            (',"suggestions":' + json.dumps(judgement['suggestions'], separators=(',', ':')) if 'suggestions' in judgement else '') +
+            '}'
+        )
+
+    def preload(self, entries):
+        """チケット部分のJSON断片を事前に生成（ワーカーの起動時に呼び出す）"""
+        for entry in entries:
+            self._ticket_fragment(entry)
+
+    def forget(self, tkt_number):
+        """チケット削除時にキャッシュを破棄"""
+        with self._lock:
+            self._fragments.pop(tkt_number, None)
+
+    def clear(self):
+        """チケットインデックスの再読み込み時にキャッシュをすべて破棄"""
+        with self._lock:
+            self._fragments = {}
+
+
+# アプリケーション全体で共有するシリアライザ
+compact_judgement_serializer = CompactJudgementSerializer()
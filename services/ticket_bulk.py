@@ -0,0 +1,211 @@
+"""チケットの一括操作（有効期限の延長・券種の変更・削除）
+
+対象はTKT番号のリスト、または一覧APIと同じ検索条件で指定する。
+変更はそれぞれ1つの UPDATE / DELETE 文で行い（削除は入園履歴の DELETE を含め1トランザクション）、
+チケットごとの読み込み・コミットは行わない。
+券種の変更・削除では対象チケットの入園日の集計も同じトランザクションで作り直す。
+プロセス内のチケットインデックス・当日入場カウンタ・判定応答のキャッシュはコミット後にまとめて反映する。
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, delete, func
+from models.ticket import Ticket
+from models.entry_log import EntryLog
+from database import db
+from database.engine import retry_on_lock
+from services.ticket_query import TicketQueryService
+from services.ticket_index import ticket_index, TicketIndexEntry
+from services.entry_counter import today_entry_counter
+from services.entry_feed import entry_feed
+from services.judgement_response import compact_judgement_serializer
+from services.attendance_stats import AttendanceStatsService
+from services.data_versions import DataVersionService, TICKETS, ENTRY_LOGS
+from services.validation import ValidationService
+
+# 一括操作の種類
+ACTIONS = ('extend', 'set_type', 'delete')
+
+
+class TicketBulkService:
+    """チケット一括操作サービス"""
+
+    @staticmethod
+    def parse_request(data):
+        """
+        一括操作のリクエストを解析
+
+        Args:
+            data: {
+                'action': 'extend' | 'set_type' | 'delete',
+                'tkt_numbers': [TKT番号, ...] または 'filter': {一覧APIと同じ検索条件},
+                'days': 延長日数（extend）, 'ticket_type': 券種（set_type）,
+                'dry_run': bool
+            }
+
+        Returns:
+            tuple: (params dict, エラーメッセージ or None)
+        """
+        if not isinstance(data, dict):
+            return None, 'リクエストの形式が不正です'
+
+        action = data.get('action')
+        if action not in ACTIONS:
+            return None, f"action には {', '.join(ACTIONS)} のいずれかを指定してください"
+        params = {'action': action, 'dry_run': bool(data.get('dry_run', False))}
+
+        # 対象の指定（TKT番号のリストまたは検索条件のどちらか一方）
+        has_numbers = data.get('tkt_numbers') is not None
+        has_filter = data.get('filter') is not None
+        if has_numbers == has_filter:
+            return None, 'tkt_numbers または filter のどちらか一方を指定してください'
+
+        if has_numbers:
+            numbers = data['tkt_numbers']
+            if not isinstance(numbers, list) or not numbers:
+                return None, 'tkt_numbers にTKT番号の配列を指定してください'
+            max_size = current_app.config['BULK_MAX_TKT_NUMBERS']
+            if len(numbers) > max_size:
+                return None, f'一度に指定できるTKT番号は{max_size}件までです'
+            params['tkt_numbers'] = sorted({str(number).strip() for number in numbers if str(number).strip()})
+        else:
+            if not isinstance(data['filter'], dict):
+                return None, 'filter には検索条件のオブジェクトを指定してください'
+            filters, error = TicketQueryService.parse_filters(data['filter'])
+            if error:
+                return None, error
+            if not filters:
+                # 全件を対象にする誤操作を防ぐ
+                return None, 'filter に1つ以上の検索条件を指定してください'
+            params['filters'] = filters
+
+        if action == 'extend':
+            days = data.get('days')
+            if isinstance(days, bool) or not isinstance(days, int) or days == 0:
+                return None, 'days には0以外の整数（延長する日数）を指定してください'
+            if abs(days) > current_app.config['BULK_MAX_EXTEND_DAYS']:
+                return None, f"days は±{current_app.config['BULK_MAX_EXTEND_DAYS']}日以内で指定してください"
+            params['days'] = days
+        elif action == 'set_type':
+            valid, msg = ValidationService.validate_ticket_type(data.get('ticket_type'))
+            if not valid:
+                return None, msg
+            params['ticket_type'] = data['ticket_type']
+
+        return params, None
+
+    @staticmethod
+    def _selection(params):
+        """対象チケットのTKT番号を返すSELECT"""
+        query = select(Ticket.tkt_number)
+        if 'tkt_numbers' in params:
+            return query.where(Ticket.tkt_number.in_(params['tkt_numbers']))
+        return TicketQueryService.apply_filters(query, params['filters'])
+
+    @staticmethod
+    def _matched_entries(selection):
+        """対象チケットのインデックス用の項目"""
+        rows = db.session.execute(
+            select(*[getattr(Ticket, field) for field in TicketIndexEntry._fields]).where(
+                Ticket.tkt_number.in_(selection)
+            )
+        ).all()
+        return [TicketIndexEntry(**row._asdict()) for row in rows]
+
+    @staticmethod
+    def _shift_date(column, days):
+        """日付列を days 日ずらすSQL式"""
+        if db.engine.dialect.name == 'sqlite':
+            return func.date(column, f'{days:+d} days')
+        return column + days
+
+    @staticmethod
+    def execute(params):
+        """一括操作を実行（dry_run の場合は対象件数のみ返す）"""
+        if params['action'] == 'delete':
+            return TicketBulkService._delete(params)
+        return TicketBulkService._update(params)
+
+    @staticmethod
+    @retry_on_lock
+    def _update(params):
+        """有効期限の延長・券種の変更（1つのUPDATE文）"""
+        selection = TicketBulkService._selection(params)
+        entries = TicketBulkService._matched_entries(selection)
+        result = {'action': params['action'], 'dry_run': params['dry_run'], 'matched': len(entries), 'updated': 0}
+        if params['dry_run'] or not entries:
+            db.session.rollback()
+            return result
+
+        if params['action'] == 'extend':
+            values = {'expiry_date': TicketBulkService._shift_date(Ticket.expiry_date, params['days'])}
+            changed = [
+                entry._replace(expiry_date=entry.expiry_date + timedelta(days=params['days']))
+                for entry in entries
+            ]
+        else:
+            values = {'ticket_type': params['ticket_type']}
+            changed = [entry._replace(ticket_type=params['ticket_type']) for entry in entries]
+            # 集計を作り直す入園日（検索条件に券種を含む場合、UPDATE後は対象を選択できないため先に取得する）
+            entry_dates = AttendanceStatsService.entry_dates(EntryLog.tkt_number.in_(selection))
+        values['updated_at'] = datetime.utcnow()
+
+        updated = db.session.execute(
+            update(Ticket).where(Ticket.tkt_number.in_(selection)).values(**values),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        if params['action'] == 'set_type':
+            # 集計の分類が変わるため、対象チケットの入園日の集計を同じトランザクションで作り直す
+            AttendanceStatsService.rebuild(dates=entry_dates, commit=False)
+        DataVersionService.bump(TICKETS)
+        db.session.commit()
+
+        ticket_index.put_mappings(entry._asdict() for entry in changed)
+
+        result['updated'] = updated
+        return result
+
+    @staticmethod
+    @retry_on_lock
+    def _delete(params):
+        """チケットと入園履歴の削除（入園履歴・チケットそれぞれ1つのDELETE文、1トランザクション）"""
+        selection = TicketBulkService._selection(params)
+        tkt_numbers = db.session.execute(selection).scalars().all()
+        logs = EntryLog.query.filter(EntryLog.tkt_number.in_(selection))
+        log_count = logs.count()
+        result = {
+            'action': 'delete',
+            'dry_run': params['dry_run'],
+            'matched': len(tkt_numbers),
+            'matched_logs': log_count,
+            'deleted': 0,
+            'deleted_logs': 0
+        }
+        if params['dry_run'] or not tkt_numbers:
+            db.session.rollback()
+            return result
+
+        # 削除される入園履歴の日付（集計を作り直す）
+        entry_dates = AttendanceStatsService.entry_dates(EntryLog.tkt_number.in_(selection))
+
+        deleted_logs = db.session.execute(
+            delete(EntryLog).where(EntryLog.tkt_number.in_(selection)),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        deleted = db.session.execute(
+            delete(Ticket).where(Ticket.tkt_number.in_(selection)),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        AttendanceStatsService.rebuild(dates=entry_dates, commit=False)
+        DataVersionService.bump(TICKETS, ENTRY_LOGS)
+        db.session.commit()
+
+        for tkt_number in tkt_numbers:
+            ticket_index.remove(tkt_number)
+            today_entry_counter.forget(tkt_number)
+            compact_judgement_serializer.forget(tkt_number)
+        if deleted_logs:
+            entry_feed.invalidate()
+
+        result['deleted'] = deleted
+        result['deleted_logs'] = deleted_logs
+        return result
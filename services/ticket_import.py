@@ -0,0 +1,194 @@
+import bisect
+import csv
+import io
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from models.ticket import Ticket
+from database import db
+from services.validation import ValidationService
+from services.ticket_index import ticket_index
+from services.data_versions import DataVersionService, TICKETS
+
+
+class TicketImportService:
+    """CSV一括登録サービス"""
+
+    DEFAULT_CHUNK_SIZE = 500
+
+    @staticmethod
+    def import_csv(binary_stream, chunk_size=None, progress=None):
+        """
+        CSVをストリームから逐次読み込み、チャンク単位で一括登録する
+
+        Args:
+            binary_stream: アップロードされたCSVのバイナリストリーム
+            chunk_size: 1トランザクションあたりの行数
+            progress: チャンク処理ごとに呼び出すコールバック progress(result)
+
+        Returns:
+            dict: 登録結果 {
+                'total_rows': int,
+                'success_count': int,
+                'error_count': int,
+                'errors': list（CSVの行順）,
+                'error_rows': list（errors と同じ順のデータ行番号。ヘッダーを除き1から数える）,
+                'elapsed_seconds': float,
+                'rows_per_second': float
+            }
+        """
+        chunk_size = chunk_size or TicketImportService.DEFAULT_CHUNK_SIZE
+        started = time.perf_counter()
+
+        result = {
+            'total_rows': 0,
+            'success_count': 0,
+            'error_count': 0,
+            'errors': [],
+            'error_rows': [],
+            'elapsed_seconds': 0.0,
+            'rows_per_second': 0.0
+        }
+
+        # ファイル全体を読み込まず、1行ずつデコードする
+        text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+        try:
+            csv_reader = csv.DictReader(text_stream)
+            seen = set()
+            chunk = []
+            # チャンク内のTKT番号 → データ行番号（DBとの重複をCSVの行順に記録するため）
+            row_numbers = {}
+
+            for row in csv_reader:
+                result['total_rows'] += 1
+                mapping = TicketImportService._parse_row(row, seen, result)
+                if mapping is None:
+                    continue
+
+                chunk.append(mapping)
+                row_numbers[mapping['tkt_number']] = result['total_rows']
+                if len(chunk) >= chunk_size:
+                    TicketImportService._flush_chunk(chunk, result, row_numbers)
+                    chunk = []
+                    row_numbers = {}
+                    TicketImportService._update_throughput(result, started)
+                    if progress:
+                        progress(result)
+
+            if chunk:
+                TicketImportService._flush_chunk(chunk, result, row_numbers)
+        finally:
+            text_stream.detach()
+
+        TicketImportService._update_throughput(result, started)
+        if progress:
+            progress(result)
+
+        return result
+
+    @staticmethod
+    def _parse_row(row, seen, result):
+        """1行をバリデーションし、INSERT用の辞書に変換（エラー時はNone）"""
+        tkt_number = (row.get('TKT番号') or '').strip()
+        row['TKT番号'] = tkt_number
+
+        valid, errors = ValidationService.validate_import_row(row)
+        if not valid:
+            TicketImportService._add_error(result, tkt_number, ', '.join(errors), result['total_rows'])
+            return None
+
+        # ファイル内の重複
+        if tkt_number in seen:
+            TicketImportService._add_error(
+                result, tkt_number, 'ファイル内でTKT番号が重複しています', result['total_rows']
+            )
+            return None
+        seen.add(tkt_number)
+
+        # 有効期限の計算（使用開始日 + 365日）
+        start_date = datetime.strptime(row['使用開始日'], '%Y/%m/%d').date()
+        now = datetime.utcnow()
+
+        return {
+            'tkt_number': tkt_number,
+            'age': int(row['年齢']),
+            'gender': row['性別'],
+            'ticket_type': row['券種'],
+            'start_date': start_date,
+            'expiry_date': start_date + timedelta(days=365),
+            'is_transfer': False,
+            'previous_tkt_number': None,
+            'remarks': row.get('備考', ''),
+            'created_at': now,
+            'updated_at': now
+        }
+
+    @staticmethod
+    def _flush_chunk(chunk, result, row_numbers):
+        """既存TKT番号を1回の問い合わせで除外し、残りを1トランザクションで一括INSERT"""
+        numbers = [mapping['tkt_number'] for mapping in chunk]
+        existing = set(db.session.execute(
+            select(Ticket.tkt_number).where(Ticket.tkt_number.in_(numbers))
+        ).scalars())
+
+        rows = []
+        for mapping in chunk:
+            if mapping['tkt_number'] in existing:
+                TicketImportService._add_error(
+                    result, mapping['tkt_number'], 'このTKT番号は既に登録されています',
+                    row_numbers[mapping['tkt_number']]
+                )
+            else:
+                rows.append(mapping)
+
+        if not rows:
+            db.session.rollback()
+            return
+
+        try:
+            db.session.execute(insert(Ticket), rows)
+            DataVersionService.bump(TICKETS)
+            db.session.commit()
+        except IntegrityError:
+            # 並行して登録された行がある場合は1行ずつ登録し直してエラー行を特定する
+            db.session.rollback()
+            rows = TicketImportService._insert_rows_individually(rows, result, row_numbers)
+        except Exception as e:
+            db.session.rollback()
+            for mapping in rows:
+                TicketImportService._add_error(result, mapping['tkt_number'], str(e), row_numbers[mapping['tkt_number']])
+            return
+
+        result['success_count'] += len(rows)
+        ticket_index.put_mappings(rows)
+
+    @staticmethod
+    def _insert_rows_individually(rows, result, row_numbers):
+        """1行ずつINSERTし、成功した行のみ返す"""
+        inserted = []
+        for mapping in rows:
+            try:
+                db.session.execute(insert(Ticket), [mapping])
+                DataVersionService.bump(TICKETS)
+                db.session.commit()
+                inserted.append(mapping)
+            except Exception as e:
+                db.session.rollback()
+                TicketImportService._add_error(result, mapping['tkt_number'], str(e), row_numbers[mapping['tkt_number']])
+        return inserted
+
+    @staticmethod
+    def _add_error(result, tkt_number, message, row_number):
+        """行エラーをCSVの行順の位置に記録（DBとの重複はチャンクの書き込み時に判明するため後から挿入される）"""
+        result['error_count'] += 1
+        position = bisect.bisect_right(result['error_rows'], row_number)
+        result['error_rows'].insert(position, row_number)
+        result['errors'].insert(position, f"TKT番号 {tkt_number or '不明'}: {message}")
+
+    @staticmethod
+    def _update_throughput(result, started):
+        """処理時間とスループットを更新"""
+        elapsed = time.perf_counter() - started
+        result['elapsed_seconds'] = round(elapsed, 3)
+        result['rows_per_second'] = round(result['total_rows'] / elapsed, 1) if elapsed > 0 else 0.0
@@ -0,0 +1,178 @@
+import threading
+from collections import namedtuple
+from flask import current_app
+from models.ticket import Ticket
+from services.ticket_suggest import TicketSuggestionIndex
+
+# 判定に必要な項目だけを保持するコンパクトなチケット情報
+TicketIndexEntry = namedtuple('TicketIndexEntry', [
+    'tkt_number',
+    'age',
+    'gender',
+    'ticket_type',
+    'start_date',
+    'expiry_date',
+    'is_transfer',
+    'previous_tkt_number'
+])
+
+
+class TicketIndex:
+    """プロセス内チケットインデックス（TKT番号 → 有効期限・券種など）"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        # 振替の系譜（前のTKT番号 → 振替後のTKT番号のタプル）
+        self._successors = {}
+        # 登録なしの番号に対する近似候補の索引
+        self.suggestions = TicketSuggestionIndex()
+
+    @staticmethod
+    def _to_entry(ticket):
+        """Ticketモデルからインデックス用エントリを生成"""
+        return TicketIndexEntry(
+            tkt_number=ticket.tkt_number,
+            age=ticket.age,
+            gender=ticket.gender,
+            ticket_type=ticket.ticket_type,
+            start_date=ticket.start_date,
+            expiry_date=ticket.expiry_date,
+            is_transfer=bool(ticket.is_transfer),
+            previous_tkt_number=ticket.previous_tkt_number
+        )
+
+    def load(self):
+        """全チケットをデータベースから読み込む（アプリケーションコンテキスト内で呼び出す）"""
+        rows = Ticket.query.with_entities(
+            Ticket.tkt_number,
+            Ticket.age,
+            Ticket.gender,
+            Ticket.ticket_type,
+            Ticket.start_date,
+            Ticket.expiry_date,
+            Ticket.is_transfer,
+            Ticket.previous_tkt_number
+        ).all()
+
+        entries = {row.tkt_number: self._to_entry(row) for row in rows}
+
+        successors = {}
+        for entry in entries.values():
+            if entry.previous_tkt_number:
+                successors.setdefault(entry.previous_tkt_number, []).append(entry.tkt_number)
+
+        with self._lock:
+            self.suggestions.rebuild(entries, current_app.config['SUGGEST_MAX_DISTANCE'])
+            self._successors = {number: tuple(numbers) for number, numbers in successors.items()}
+            self._entries = entries
+            self.loaded = True
+
+        return len(entries)
+
+    def get(self, tkt_number):
+        """TKT番号からエントリを取得（未登録の場合はNone）"""
+        return self._entries.get(tkt_number)
+
+    def _unlink(self, entry):
+        """系譜から外す（ロック取得済みで呼び出す）"""
+        if entry.previous_tkt_number:
+            numbers = tuple(
+                number for number in self._successors.get(entry.previous_tkt_number, ())
+                if number != entry.tkt_number
+            )
+            if numbers:
+                self._successors[entry.previous_tkt_number] = numbers
+            else:
+                self._successors.pop(entry.previous_tkt_number, None)
+
+    def _store(self, entry):
+        """エントリを登録・差し替え、系譜・近似候補の索引を更新（ロック取得済みで呼び出す）"""
+        current = self._entries.get(entry.tkt_number)
+        if current is None:
+            self.suggestions.add(entry.tkt_number)
+        elif current.previous_tkt_number != entry.previous_tkt_number:
+            self._unlink(current)
+        if entry.previous_tkt_number and (current is None or current.previous_tkt_number != entry.previous_tkt_number):
+            self._successors[entry.previous_tkt_number] = (
+                self._successors.get(entry.previous_tkt_number, ()) + (entry.tkt_number,)
+            )
+        self._entries[entry.tkt_number] = entry
+
+    def put(self, ticket):
+        """チケットの登録・更新を反映"""
+        entry = self._to_entry(ticket)
+        with self._lock:
+            self._store(entry)
+
+    def put_many(self, tickets):
+        """複数チケットの登録・更新を反映"""
+        entries = [self._to_entry(ticket) for ticket in tickets]
+        with self._lock:
+            for entry in entries:
+                self._store(entry)
+
+    def put_mappings(self, mappings):
+        """一括INSERTに使用した辞書の内容を反映"""
+        entries = [
+            TicketIndexEntry(**{field: mapping.get(field) for field in TicketIndexEntry._fields})
+            for mapping in mappings
+        ]
+        with self._lock:
+            for entry in entries:
+                self._store(entry)
+
+    def remove(self, tkt_number):
+        """チケットの削除を反映"""
+        with self._lock:
+            entry = self._entries.pop(tkt_number, None)
+            if entry is not None:
+                self._unlink(entry)
+                self.suggestions.remove(tkt_number)
+
+    def lineage(self, tkt_number):
+        """振替の系譜（登録済みの前のチケット・振替後のチケットをたどって到達する全TKT番号。本人を含む）"""
+        members = {tkt_number}
+        pending = [tkt_number]
+        while pending:
+            number = pending.pop()
+            entry = self._entries.get(number)
+            neighbors = list(self._successors.get(number, ()))
+            if entry is not None and entry.previous_tkt_number:
+                neighbors.append(entry.previous_tkt_number)
+            for neighbor in neighbors:
+                # 削除済みのチケットは系譜をつながない（データベース上の系譜と合わせる）
+                if neighbor not in members and neighbor in self._entries:
+                    members.add(neighbor)
+                    pending.append(neighbor)
+        return members
+
+    def suggest(self, tkt_number, limit=5):
+        """未登録のTKT番号に近い登録済みのTKT番号を返す"""
+        return self.suggestions.suggest(tkt_number, limit)
+
+    def entries(self):
+        """全エントリのリスト"""
+        return list(self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def entry_to_dict(entry):
+        """エントリを判定レスポンス用の辞書に変換"""
+        return {
+            'tkt_number': entry.tkt_number,
+            'age': entry.age,
+            'gender': entry.gender,
+            'ticket_type': entry.ticket_type,
+            'start_date': entry.start_date.isoformat() if entry.start_date else None,
+            'expiry_date': entry.expiry_date.isoformat() if entry.expiry_date else None,
+            'is_transfer': entry.is_transfer,
+            'previous_tkt_number': entry.previous_tkt_number
+        }
+
+
+# アプリケーション全体で共有するインデックス
+ticket_index = TicketIndex()
@@ -0,0 +1,52 @@
+"""振替の系譜（previous_tkt_number のつながり）
+
+再発行されたチケットは previous_tkt_number で前のチケットを参照するため、
+系譜をたどって同じ来園者のチケットをまとめて取得する。
+前のチケットをさかのぼる再帰CTEと、その全員から振替後のチケットをたどる再帰CTEを
+1つのSQLで実行するため、系譜の長さによらず問い合わせは1回で済む。
+（UNION で重複を除くため、参照が循環していても終了する）
+"""
+from sqlalchemy import select
+from models.ticket import Ticket
+from database import db
+
+
+class TicketLineageService:
+    """振替の系譜サービス"""
+
+    @staticmethod
+    def members_query(tkt_number):
+        """系譜に含まれるTKT番号を返すSELECT（他のクエリの副問い合わせにも使用できる）"""
+        tickets = Ticket.__table__
+
+        # 前のチケットをさかのぼる
+        ancestors = select(tickets.c.tkt_number, tickets.c.previous_tkt_number).where(
+            tickets.c.tkt_number == tkt_number
+        ).cte('lineage_ancestors', recursive=True)
+        ancestors = ancestors.union(
+            select(tickets.c.tkt_number, tickets.c.previous_tkt_number).where(
+                tickets.c.tkt_number == ancestors.c.previous_tkt_number
+            )
+        )
+
+        # さかのぼった全員から振替後のチケットをたどる
+        members = select(ancestors.c.tkt_number).cte('lineage_members', recursive=True)
+        members = members.union(
+            select(tickets.c.tkt_number).where(tickets.c.previous_tkt_number == members.c.tkt_number)
+        )
+
+        return select(members.c.tkt_number)
+
+    @staticmethod
+    def chain(tkt_number):
+        """
+        系譜のチケットを古い順に取得
+
+        Returns:
+            list: [Ticket, ...]（チケットが存在しない場合は空）
+        """
+        return db.session.execute(
+            select(Ticket).where(
+                Ticket.tkt_number.in_(TicketLineageService.members_query(tkt_number))
+            ).order_by(Ticket.start_date, Ticket.created_at, Ticket.tkt_number)
+        ).scalars().all()
@@ -0,0 +1,96 @@
+from datetime import datetime
+from models.ticket import Ticket
+
+
+class TicketQueryService:
+    """チケットの検索条件サービス（一覧・エクスポート共通）"""
+
+    @staticmethod
+    def parse_filters(args):
+        """
+        クエリパラメータから検索条件を取り出す
+
+        Args:
+            args: request.args
+
+        Returns:
+            tuple: (filters dict, エラーメッセージ or None)
+        """
+        filters = {}
+
+        tkt_number = (args.get('tkt_number') or '').strip()
+        if tkt_number:
+            filters['tkt_number'] = tkt_number
+
+        ticket_type = args.get('ticket_type')
+        if ticket_type:
+            filters['ticket_type'] = ticket_type
+
+        gender = args.get('gender')
+        if gender:
+            filters['gender'] = gender
+
+        for key in ('expiry_from', 'expiry_to'):
+            value = args.get(key)
+            if not value:
+                continue
+            try:
+                filters[key] = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                return None, f'{key} は YYYY-MM-DD 形式で指定してください'
+
+        return filters, None
+
+    @staticmethod
+    def apply_filters(query, filters):
+        """検索条件をクエリに適用"""
+        if 'tkt_number' in filters:
+            # 前方一致（主キーのインデックスを使うため範囲条件で指定）
+            prefix = filters['tkt_number']
+            query = query.filter(Ticket.tkt_number >= prefix, Ticket.tkt_number < prefix + '\uffff')
+
+        if 'ticket_type' in filters:
+            query = query.filter(Ticket.ticket_type == filters['ticket_type'])
+
+        if 'gender' in filters:
+            query = query.filter(Ticket.gender == filters['gender'])
+
+        if 'expiry_from' in filters:
+            query = query.filter(Ticket.expiry_date >= filters['expiry_from'])
+
+        if 'expiry_to' in filters:
+            query = query.filter(Ticket.expiry_date <= filters['expiry_to'])
+
+        return query
+
+    # 一覧で指定可能なソート項目
+    SORT_COLUMNS = {
+        'tkt_number': Ticket.tkt_number,
+        'created_at': Ticket.created_at,
+        'expiry_date': Ticket.expiry_date,
+        'start_date': Ticket.start_date,
+        'age': Ticket.age
+    }
+
+    @staticmethod
+    def apply_sort(query, sort, order):
+        """
+        ソート条件をクエリに適用
+
+        Returns:
+            tuple: (query, エラーメッセージ or None)
+        """
+        column = TicketQueryService.SORT_COLUMNS.get(sort or 'created_at')
+        if column is None:
+            return None, f"sort は {', '.join(TicketQueryService.SORT_COLUMNS)} のいずれかを指定してください"
+
+        order = order or 'desc'
+        if order not in ('asc', 'desc'):
+            return None, 'order は asc または desc を指定してください'
+
+        if order == 'desc':
+            query = query.order_by(column.desc(), Ticket.tkt_number.desc())
+        else:
+            query = query.order_by(column.asc(), Ticket.tkt_number.asc())
+
+        return query, None
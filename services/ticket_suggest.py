@@ -0,0 +1,105 @@
+"""TKT番号の近似候補（入力ミスの訂正候補）
+
+登録済みのTKT番号から1文字ずつ削除した文字列（最大 max_distance 文字）を索引にしておき、
+入力された番号の削除文字列と突き合わせて候補を絞り込む（SymSpell方式）。
+候補は編集距離（隣接2文字の入れ替えを1回と数える）で確認し、近い順に返す。
+照合は索引の参照のみで行うため、登録件数によらず数マイクロ秒～数十マイクロ秒で完了する。
+
+索引の大きさは max_distance=1 でTKT番号1件あたり（桁数 + 1）件程度。
+max_distance=2 では桁数の2乗に比例して増えるため、登録件数が多い場合は1を推奨する。
+"""
+import threading
+from itertools import combinations
+
+
+def _deletes(value, max_distance):
+    """value から最大 max_distance 文字を削除した文字列の集合（value 自身を含む）"""
+    results = {value}
+    for count in range(1, min(max_distance, len(value)) + 1):
+        for positions in combinations(range(len(value)), count):
+            results.add(''.join(ch for i, ch in enumerate(value) if i not in positions))
+    return results
+
+
+def edit_distance(a, b, limit):
+    """編集距離（挿入・削除・置換・隣接2文字の入れ替え）。limit を超える場合は limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class TicketSuggestionIndex:
+    """登録済みTKT番号の近似検索用インデックス"""
+
+    def __init__(self, max_distance=1):
+        self.max_distance = max_distance
+        # 削除文字列 → TKT番号のタプル（更新時はタプルごと差し替え、参照はロックなしで行う）
+        self._deletes = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, tkt_numbers, max_distance=None):
+        """全TKT番号から作り直す"""
+        if max_distance is not None:
+            self.max_distance = max_distance
+        index = {}
+        for tkt_number in tkt_numbers:
+            for key in _deletes(tkt_number, self.max_distance):
+                index.setdefault(key, []).append(tkt_number)
+        deletes = {key: tuple(numbers) for key, numbers in index.items()}
+        with self._lock:
+            self._deletes = deletes
+
+    def add(self, tkt_number):
+        """TKT番号を追加"""
+        with self._lock:
+            for key in _deletes(tkt_number, self.max_distance):
+                numbers = self._deletes.get(key, ())
+                if tkt_number not in numbers:
+                    self._deletes[key] = numbers + (tkt_number,)
+
+    def remove(self, tkt_number):
+        """TKT番号を削除"""
+        with self._lock:
+            for key in _deletes(tkt_number, self.max_distance):
+                numbers = tuple(number for number in self._deletes.get(key, ()) if number != tkt_number)
+                if numbers:
+                    self._deletes[key] = numbers
+                else:
+                    self._deletes.pop(key, None)
+
+    def suggest(self, value, limit=5, max_distance=None):
+        """
+        value に近い登録済みTKT番号を返す（value 自身は除く）
+
+        Returns:
+            list: TKT番号（編集距離・番号の昇順）
+        """
+        max_distance = min(self.max_distance if max_distance is None else max_distance, self.max_distance)
+        if not value or max_distance < 1:
+            return []
+
+        candidates = set()
+        for key in _deletes(value, max_distance):
+            candidates.update(self._deletes.get(key, ()))
+        candidates.discard(value)
+
+        scored = []
+        for candidate in candidates:
+            distance = edit_distance(value, candidate, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, candidate))
+        scored.sort()
+        return [candidate for _, candidate in scored[:limit]]
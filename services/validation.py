@@ -40,13 +40,14 @@ class ValidationService:
         return True, None
 
     @staticmethod
-    def validate_date(date_str):
+    def validate_date(date_str, date_format='%Y-%m-%d'):
         """日付のバリデーション"""
         try:
-            datetime.strptime(date_str, '%Y-%m-%d')
+            datetime.strptime(date_str, date_format)
             return True, None
         except (ValueError, TypeError):
-            return False, "日付は YYYY-MM-DD 形式で入力してください"
+            label = date_format.replace('%Y', 'YYYY').replace('%m', 'MM').replace('%d', 'DD')
+            return False, f"日付は {label} 形式で入力してください"
 
     @staticmethod
     def validate_ticket_data(data):
@@ -82,3 +83,33 @@ class ValidationService:
             return False, errors
 
         return True, None
+
+    @staticmethod
+    def validate_import_row(row):
+        """CSV一括登録の1行分のバリデーション（列名は日本語ヘッダー）"""
+        errors = []
+
+        valid, msg = ValidationService.validate_tkt_number(row.get('TKT番号'))
+        if not valid:
+            errors.append(msg)
+
+        valid, msg = ValidationService.validate_age(row.get('年齢'))
+        if not valid:
+            errors.append(msg)
+
+        valid, msg = ValidationService.validate_gender(row.get('性別'))
+        if not valid:
+            errors.append(msg)
+
+        valid, msg = ValidationService.validate_ticket_type(row.get('券種'))
+        if not valid:
+            errors.append(msg)
+
+        valid, msg = ValidationService.validate_date(row.get('使用開始日'), '%Y/%m/%d')
+        if not valid:
+            errors.append(msg)
+
+        if errors:
+            return False, errors
+
+        return True, None
@@ -1,22 +1,166 @@
 // API BaseURL
 const API_BASE = '/api';
 
+// 次ページ取得用のカーソル
+let nextCursor = null;
+
+// リアルタイム配信の接続
+let liveSource = null;
+
 // ページロード時の初期化
 document.addEventListener('DOMContentLoaded', () => {
     loadHistory();
+    toggleLiveUpdate();
 });
 
 /**
- * 履歴一覧を読み込み
+ * リアルタイム更新の開始・停止
  */
-async function loadHistory(tktNumber = null) {
+function toggleLiveUpdate() {
+    const enabled = document.getElementById('liveUpdate').checked;
+    const status = document.getElementById('liveStatus');
+
+    if (!enabled) {
+        if (liveSource) {
+            liveSource.close();
+            liveSource = null;
+        }
+        status.textContent = '';
+        return;
+    }
+
+    if (liveSource || !window.EventSource) {
+        return;
+    }
+
+    liveSource = new EventSource(`${API_BASE}/history/stream`);
+    liveSource.onopen = () => { status.textContent = '（接続中）'; };
+    liveSource.onerror = () => { status.textContent = '（再接続中…）'; };
+
+    liveSource.addEventListener('stats', (e) => {
+        renderStats(JSON.parse(e.data).stats);
+    });
+
+    liveSource.addEventListener('entries', (e) => {
+        const data = JSON.parse(e.data);
+        renderStats(data.stats);
+        prependLiveLogs(data.logs);
+    });
+
+    // 受信が追いつかなかった場合は一覧を再取得
+    liveSource.addEventListener('reset', () => {
+        loadHistory();
+    });
+}
+
+/**
+ * 本日の時間帯別集計を表示
+ */
+function renderStats(stats) {
+    if (!stats) return;
+
+    const total = stats.total;
+    document.getElementById('liveTotal').textContent =
+        `入場OK: ${total.ok} / NG: ${total.ng} / 再入場: ${total.reentry}`;
+
+    const tbody = document.getElementById('hourlyTableBody');
+    tbody.innerHTML = '';
+    stats.hours.forEach(hour => {
+        const row = tbody.insertRow();
+        row.innerHTML = `
+            <td>${String(hour.hour).padStart(2, '0')}:00～</td>
+            <td>${hour.ok}</td>
+            <td>${hour.ng}</td>
+            <td>${hour.reentry}</td>
+        `;
+    });
+}
+
+/**
+ * 配信された履歴を一覧の先頭に追加（検索条件の指定がない場合のみ）
+ */
+function prependLiveLogs(logs) {
+    if (buildHistoryParams().toString()) {
+        return;
+    }
+
+    const tbody = document.getElementById('historyTableBody');
+    logs.forEach(log => {
+        const row = tbody.insertRow(0);
+        row.innerHTML = historyRowHtml(log);
+    });
+}
+
+/**
+ * 履歴一覧の1行分のHTML
+ */
+function historyRowHtml(log) {
+    return `
+        <td>${log.id}</td>
+        <td>${log.tkt_number}</td>
+        <td>${formatDateTime(log.entry_time)}</td>
+        <td>${log.result}</td>
+        <td>${log.comment || ''}</td>
+        <td>${log.is_reentry ? '○' : ''}</td>
+        <td>
+            <button onclick="openEditModal(${log.id})">編集</button>
+            <button class="btn-danger" onclick="deleteHistory(${log.id})">削除</button>
+        </td>
+    `;
+}
+
+/**
+ * 検索条件をクエリパラメータに変換
+ */
+function buildHistoryParams() {
+    const params = new URLSearchParams();
+    const conditions = {
+        tkt_number: document.getElementById('searchTktNumber').value.trim(),
+        date_from: document.getElementById('searchDateFrom').value,
+        date_to: document.getElementById('searchDateTo').value,
+        result: document.getElementById('searchResult').value,
+        is_reentry: document.getElementById('searchReentry').value
+    };
+
+    Object.entries(conditions).forEach(([key, value]) => {
+        if (value) {
+            params.set(key, value);
+        }
+    });
+
+    return params;
+}
+
+/**
+ * 履歴一覧を読み込み（1ページ目）
+ */
+async function loadHistory() {
+    const tbody = document.getElementById('historyTableBody');
+    tbody.innerHTML = '';
+    nextCursor = null;
+    await fetchHistoryPage();
+}
+
+/**
+ * 履歴の次ページを読み込み
+ */
+async function loadMoreHistory() {
+    if (nextCursor) {
+        await fetchHistoryPage(nextCursor);
+    }
+}
+
+/**
+ * 履歴を1ページ取得して一覧に追加
+ */
+async function fetchHistoryPage(cursor = null) {
     try {
-        let url = `${API_BASE}/history`;
-        if (tktNumber) {
-            url += `?tkt_number=${tktNumber}`;
+        const params = buildHistoryParams();
+        if (cursor) {
+            params.set('cursor', cursor);
         }
 
-        const response = await fetch(url);
+        const response = await fetch(`${API_BASE}/history?${params.toString()}`);
         const data = await response.json();
 
         if (!response.ok) {
@@ -25,24 +169,15 @@ async function loadHistory(tktNumber = null) {
         }
 
         const tbody = document.getElementById('historyTableBody');
-        tbody.innerHTML = '';
 
         data.logs.forEach(log => {
             const row = tbody.insertRow();
-            row.innerHTML = `
-                <td>${log.id}</td>
-                <td>${log.tkt_number}</td>
-                <td>${formatDateTime(log.entry_time)}</td>
-                <td>${log.result}</td>
-                <td>${log.comment || ''}</td>
-                <td>${log.is_reentry ? '○' : ''}</td>
-                <td>
-                    <button onclick="openEditModal(${log.id})">編集</button>
-                    <button class="btn-danger" onclick="deleteHistory(${log.id})">削除</button>
-                </td>
-            `;
+            row.innerHTML = historyRowHtml(log);
         });
 
+        nextCursor = data.next_cursor;
+        document.getElementById('loadMoreButton').style.display = nextCursor ? 'inline-block' : 'none';
+
     } catch (error) {
         console.error('Error:', error);
         alert('履歴一覧の取得中にエラーが発生しました');
@@ -53,12 +188,7 @@ async function loadHistory(tktNumber = null) {
  * 履歴を検索
  */
 function searchHistory() {
-    const tktNumber = document.getElementById('searchTktNumber').value.trim();
-    if (tktNumber) {
-        loadHistory(tktNumber);
-    } else {
-        loadHistory();
-    }
+    loadHistory();
 }
 
 /**
@@ -66,6 +196,10 @@ function searchHistory() {
  */
 function clearSearch() {
     document.getElementById('searchTktNumber').value = '';
+    document.getElementById('searchDateFrom').value = '';
+    document.getElementById('searchDateTo').value = '';
+    document.getElementById('searchResult').value = '';
+    document.getElementById('searchReentry').value = '';
     loadHistory();
 }
 
@@ -191,7 +325,9 @@ async function deleteHistory(logId) {
  * 履歴データをCSV出力
  */
 function exportHistory() {
-    window.location.href = `${API_BASE}/export/history`;
+    const params = buildHistoryParams();
+    const query = params.toString();
+    window.location.href = `${API_BASE}/export/history${query ? '?' + query : ''}`;
 }
 
 /**
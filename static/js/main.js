@@ -1,11 +1,8 @@
 // API BaseURL
 const API_BASE = '/api';
 
-// チケットデータをメモリにキャッシュ
-let ticketCache = new Map();
-
 // ページロード時の初期化
-document.addEventListener('DOMContentLoaded', async () => {
+document.addEventListener('DOMContentLoaded', () => {
     // TKT入力フィールドでEnterキー押下時に判定実行
     const tktInput = document.getElementById('tktInput');
     if (tktInput) {
@@ -19,59 +16,8 @@ document.addEventListener('DOMContentLoaded', async () => {
 
     // 最新の履歴を読み込み
     loadRecentHistory();
-
-    // 全チケットデータをメモリに読み込み
-    await loadAllTicketsToCache();
 });
 
-/**
- * 全チケットデータをメモリに読み込み
- */
-async function loadAllTicketsToCache() {
-    try {
-        const response = await fetch(`${API_BASE}/tickets`);
-        const data = await response.json();
-
-        if (!response.ok) {
-            console.error('チケットデータの読み込みに失敗しました');
-            return;
-        }
-
-        // キャッシュをクリアして再構築
-        ticketCache.clear();
-        data.tickets.forEach(ticket => {
-            ticketCache.set(ticket.tkt_number, ticket);
-        });
-
-        console.log(`${ticketCache.size}件のチケットデータをメモリに読み込みました`);
-
-    } catch (error) {
-        console.error('チケットデータ読み込みエラー:', error);
-    }
-}
-
-/**
- * サーバから特定のチケットを取得してキャッシュに追加
- */
-async function fetchAndCacheTicket(tktNumber) {
-    try {
-        const response = await fetch(`${API_BASE}/tickets/${tktNumber}`);
-        const data = await response.json();
-
-        if (response.ok && data.ticket) {
-            // キャッシュに追加
-            ticketCache.set(tktNumber, data.ticket);
-            return data.ticket;
-        }
-
-        return null;
-
-    } catch (error) {
-        console.error('チケット取得エラー:', error);
-        return null;
-    }
-}
-
 /**
  * 入場判定を実行
  */
@@ -86,17 +32,10 @@ async function performJudgement() {
     }
 
     try {
-        // 1. まずキャッシュから検索（高速化のため）
-        let ticket = ticketCache.get(tktNumber);
-
-        // 2. キャッシュに無ければサーバから取得を試みる
-        if (!ticket) {
-            console.log(`TKT番号 ${tktNumber} がキャッシュに無いため、サーバから取得を試みます`);
-            ticket = await fetchAndCacheTicket(tktNumber);
-        }
-
-        // 3. サーバに判定リクエストを送信（登録なしの場合も送信して履歴に記録）
-        const response = await fetch(`${API_BASE}/entry/judge`, {
+        // サーバに判定リクエストを送信（登録なしの場合も送信して履歴に記録）
+        // チケット情報はサーバ側のチケットインデックスで参照されるため、事前取得は不要
+        // 画面表示に必要な項目のみのコンパクトレスポンスを要求
+        const response = await fetch(`${API_BASE}/entry/judge?compact=1`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -137,7 +76,7 @@ async function performJudgement() {
         }
 
         // 判定結果を表示（OK/NG両方、音声も再生される）
-        displayJudgementResult(data);
+        displayJudgementResult(expandCompactJudgement(data));
 
         // 入力フィールドをクリア
         tktInput.value = '';
@@ -172,6 +111,28 @@ async function performJudgement() {
     }
 }
 
+/**
+ * コンパクトレスポンスを表示用の形式に変換
+ */
+function expandCompactJudgement(data) {
+    return {
+        judgement: {
+            valid: data.valid,
+            result: data.result,
+            comment: data.comment,
+            is_reentry: data.is_reentry,
+            ticket: data.ticket,
+            suggestions: data.suggestions || []
+        },
+        entry_log: {
+            tkt_number: data.tkt_number,
+            entry_time: data.entry_time,
+            result: data.result,
+            comment: data.comment
+        }
+    };
+}
+
 /**
  * 判定結果を画面に表示
  */
@@ -221,6 +182,9 @@ function displayJudgementResult(data) {
         } else {
             judgementValue.innerHTML = `<div style="font-size: 100px; font-weight: bold;">${result}</div>`;
         }
+
+        // 登録なしの場合は近い登録済みTKT番号を候補として表示（押すとその番号で判定）
+        renderSuggestions(judgementValue, judgement.suggestions);
     }
 
     // 情報表示エリア更新
@@ -241,12 +205,40 @@ function displayJudgementResult(data) {
 
     // 音声再生（OK/NGに応じて）
     if (result === 'OK') {
-        playSound('/static/sounds/ok.wav');
+        playSound(SOUND_URLS.ok);
     } else if (result === 'NG') {
-        playSound('/static/sounds/ng.wav');
+        playSound(SOUND_URLS.ng);
     }
 }
 
+/**
+ * 入力ミスの訂正候補を表示
+ */
+function renderSuggestions(container, suggestions) {
+    if (!suggestions || suggestions.length === 0) {
+        return;
+    }
+
+    const wrapper = document.createElement('div');
+    wrapper.className = 'suggestions';
+    wrapper.appendChild(document.createTextNode('もしかして: '));
+
+    suggestions.forEach((tktNumber) => {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'suggestion-button';
+        button.textContent = tktNumber;
+        button.addEventListener('click', () => {
+            const tktInput = document.getElementById('tktInput');
+            tktInput.value = tktNumber;
+            performJudgement();
+        });
+        wrapper.appendChild(button);
+    });
+
+    container.appendChild(wrapper);
+}
+
 /**
  * 音声を再生（連続再生対応）
  */
@@ -338,11 +330,14 @@ async function uploadCSV() {
             return;
         }
 
-        alert(data.message);
-        closeImportDialog();
+        // バックグラウンドジョブの完了を待つ
+        const job = await pollImportJob(data.job_id);
+        if (!job) {
+            return;
+        }
 
-        // キャッシュを再読み込み
-        await loadAllTicketsToCache();
+        alert(job.message);
+        closeImportDialog();
 
     } catch (error) {
         console.error('Error:', error);
@@ -350,6 +345,41 @@ async function uploadCSV() {
     }
 }
 
+/**
+ * CSV一括登録ジョブの進捗をポーリング
+ */
+async function pollImportJob(jobId) {
+    const progress = document.getElementById('importProgress');
+
+    while (true) {
+        const response = await fetch(`${API_BASE}/tickets/import/${jobId}`);
+        const data = await response.json();
+
+        if (!response.ok) {
+            alert(data.error || '進捗の取得に失敗しました');
+            return null;
+        }
+
+        const job = data.job;
+        if (progress) {
+            progress.textContent = `処理中: ${job.total_rows}行 (エラー ${job.error_count}件, ${job.rows_per_second}行/秒)`;
+        }
+
+        if (job.status === 'completed') {
+            if (progress) progress.textContent = '';
+            return job;
+        }
+
+        if (job.status === 'failed') {
+            if (progress) progress.textContent = '';
+            alert(job.message || 'CSV読み込みに失敗しました');
+            return null;
+        }
+
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 /**
  * 履歴データをCSV出力
  */
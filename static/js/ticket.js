@@ -27,17 +27,42 @@ document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('tktNumber').focus();
 });
 
+// 一覧の表示ページ
+let currentPage = 1;
+
+/**
+ * 検索条件をクエリパラメータに変換
+ */
+function buildTicketParams(page) {
+    const params = new URLSearchParams();
+    const conditions = {
+        tkt_number: document.getElementById('searchTktNumber').value.trim(),
+        ticket_type: document.getElementById('searchTicketType').value,
+        gender: document.getElementById('searchGender').value,
+        expiry_from: document.getElementById('searchExpiryFrom').value,
+        expiry_to: document.getElementById('searchExpiryTo').value,
+        sort: document.getElementById('sortColumn').value,
+        order: document.getElementById('sortOrder').value
+    };
+
+    Object.entries(conditions).forEach(([key, value]) => {
+        if (value) {
+            params.set(key, value);
+        }
+    });
+    params.set('page', page);
+
+    return params;
+}
+
 /**
- * 年間パスポート一覧を読み込み
+ * 年間パスポート一覧を読み込み（表示中のページのみ取得）
  */
-async function loadTickets() {
+async function loadTickets(page = currentPage) {
     try {
-        console.log('年間パスポート一覧を読み込み中...');
-        const response = await fetch(`${API_BASE}/tickets`);
+        const response = await fetch(`${API_BASE}/tickets?${buildTicketParams(page).toString()}`);
         const data = await response.json();
 
-        console.log('APIレスポンス:', data);
-
         if (!response.ok) {
             console.error('APIエラー:', data.error);
             showMessage(data.error || '年間パスポート一覧の取得に失敗しました', 'error');
@@ -51,7 +76,6 @@ async function loadTickets() {
         }
 
         tbody.innerHTML = '';
-        console.log(`チケット数: ${data.tickets.length}`);
 
         data.tickets.forEach(ticket => {
             const row = tbody.insertRow();
@@ -70,12 +94,52 @@ async function loadTickets() {
             `;
         });
 
+        // ページ情報を更新
+        currentPage = data.page;
+        document.getElementById('pageInfo').textContent =
+            `${data.total}件中 ${data.page} / ${Math.max(data.pages, 1)} ページ`;
+        document.getElementById('prevPageButton').disabled = data.page <= 1;
+        document.getElementById('nextPageButton').disabled = data.page >= data.pages;
+
     } catch (error) {
         console.error('Error:', error);
         showMessage('年間パスポート一覧の取得中にエラーが発生しました', 'error');
     }
 }
 
+/**
+ * 検索条件で一覧を再読み込み
+ */
+function searchTickets() {
+    loadTickets(1);
+}
+
+/**
+ * 検索条件をクリア
+ */
+function clearTicketSearch() {
+    ['searchTktNumber', 'searchTicketType', 'searchGender', 'searchExpiryFrom', 'searchExpiryTo'].forEach(id => {
+        document.getElementById(id).value = '';
+    });
+    loadTickets(1);
+}
+
+/**
+ * 前のページ
+ */
+function prevPage() {
+    if (currentPage > 1) {
+        loadTickets(currentPage - 1);
+    }
+}
+
+/**
+ * 次のページ
+ */
+function nextPage() {
+    loadTickets(currentPage + 1);
+}
+
 /**
  * 年間パスポート新規登録
  */
@@ -134,11 +198,6 @@ async function registerTicket() {
         // TKT番号にフォーカスを戻す
         document.getElementById('tktNumber').focus();
 
-        // メモリキャッシュを更新（main.jsの関数が存在する場合）
-        if (typeof loadAllTicketsToCache === 'function') {
-            await loadAllTicketsToCache();
-        }
-
     } catch (error) {
         console.error('Error:', error);
         showMessage('年間パスポート登録中にエラーが発生しました', 'error');
@@ -243,11 +302,6 @@ async function updateTicket() {
         closeEditModal();
         loadTickets();
 
-        // メモリキャッシュを更新（main.jsの関数が存在する場合）
-        if (typeof loadAllTicketsToCache === 'function') {
-            await loadAllTicketsToCache();
-        }
-
     } catch (error) {
         console.error('Error:', error);
         showMessage('年間パスポート更新中にエラーが発生しました', 'error');
@@ -277,14 +331,88 @@ async function deleteTicket(tktNumber) {
         showMessage('年間パスポートを削除しました', 'success');
         loadTickets();
 
-        // メモリキャッシュを更新（main.jsの関数が存在する場合）
-        if (typeof loadAllTicketsToCache === 'function') {
-            await loadAllTicketsToCache();
+    } catch (error) {
+        console.error('Error:', error);
+        showMessage('年間パスポート削除中にエラーが発生しました', 'error');
+    }
+}
+
+/**
+ * CSVファイルをアップロード（バックグラウンドで一括登録）
+ */
+async function uploadCSV() {
+    const fileInput = document.getElementById('csvFile');
+    const file = fileInput.files[0];
+
+    if (!file) {
+        showMessage('ファイルを選択してください', 'error');
+        return;
+    }
+
+    const formData = new FormData();
+    formData.append('file', file);
+
+    try {
+        const response = await fetch(`${API_BASE}/tickets/import`, {
+            method: 'POST',
+            body: formData
+        });
+
+        const data = await response.json();
+
+        if (!response.ok) {
+            showMessage(data.error || 'アップロードに失敗しました', 'error');
+            return;
+        }
+
+        const job = await pollImportJob(data.job_id);
+        if (!job) {
+            return;
+        }
+
+        showMessage(job.message, job.error_count > 0 ? 'error' : 'success');
+        if (job.errors.length > 0) {
+            console.warn('CSV読み込みエラー:', job.errors);
         }
+        fileInput.value = '';
+        loadTickets();
 
     } catch (error) {
         console.error('Error:', error);
-        showMessage('年間パスポート削除中にエラーが発生しました', 'error');
+        showMessage('アップロード中にエラーが発生しました', 'error');
+    }
+}
+
+/**
+ * CSV一括登録ジョブの進捗をポーリング
+ */
+async function pollImportJob(jobId) {
+    const progress = document.getElementById('importProgress');
+
+    while (true) {
+        const response = await fetch(`${API_BASE}/tickets/import/${jobId}`);
+        const data = await response.json();
+
+        if (!response.ok) {
+            showMessage(data.error || '進捗の取得に失敗しました', 'error');
+            return null;
+        }
+
+        const job = data.job;
+        progress.textContent = `処理中: ${job.total_rows}行 (エラー ${job.error_count}件, ${job.rows_per_second}行/秒)`;
+
+        if (job.status === 'completed') {
+            progress.textContent = '';
+            return job;
+        }
+
+        if (job.status === 'failed') {
+            progress.textContent = '';
+            showMessage(job.message || 'CSV読み込みに失敗しました', 'error');
+            return null;
+        }
+
+        await new Promise(resolve => setTimeout(resolve, 1000));
     }
 }
 
@@ -292,7 +420,10 @@ async function deleteTicket(tktNumber) {
  * 年間パスポートデータをCSV出力
  */
 function exportTickets() {
-    window.location.href = `${API_BASE}/export/tickets`;
+    const params = buildTicketParams(1);
+    ['page', 'sort', 'order'].forEach(key => params.delete(key));
+    const query = params.toString();
+    window.location.href = `${API_BASE}/export/tickets${query ? '?' + query : ''}`;
 }
 
 /**
@@ -0,0 +1,57 @@
+"""静的ファイルのフィンガープリント付きURLとキャッシュ設定
+
+テンプレートでは static_url('css/style.css') で内容のハッシュを付けたURL（?v=...）を生成する。
+ハッシュ付きのURLは内容が変わるとURLも変わるため、ブラウザに1年間の不変キャッシュを許可する。
+ハッシュは更新日時が変わった場合のみ再計算する。
+"""
+import hashlib
+import os
+import threading
+from flask import url_for, request
+
+# ファイル名 → (更新日時, ハッシュ)
+_fingerprints = {}
+_lock = threading.Lock()
+
+
+def fingerprint(static_folder, filename):
+    """静的ファイルの内容のハッシュ（先頭12文字）"""
+    path = os.path.join(static_folder, filename)
+    mtime = os.path.getmtime(path)
+
+    cached = _fingerprints.get(filename)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as static_file:
+        for block in iter(lambda: static_file.read(64 * 1024), b''):
+            digest.update(block)
+    value = digest.hexdigest()[:12]
+
+    with _lock:
+        _fingerprints[filename] = (mtime, value)
+    return value
+
+
+def register_static_assets(app):
+    """static_url テンプレート関数と、ハッシュ付きURLのキャッシュヘッダを登録"""
+    max_age = app.config['STATIC_MAX_AGE']
+
+    @app.template_global()
+    def static_url(filename):
+        """ハッシュ付きの静的ファイルURL"""
+        try:
+            version = fingerprint(app.static_folder, filename)
+        except OSError:
+            return url_for('static', filename=filename)
+        return url_for('static', filename=filename, v=version)
+
+    @app.after_request
+    def cache_static(response):
+        if request.endpoint == 'static' and request.args.get('v') and response.status_code in (200, 304):
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response.cache_control.no_cache = None
+            response.cache_control.immutable = True
+        return response
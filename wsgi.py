@@ -1,7 +1,10 @@
 """WSGI エントリーポイント（本番環境用）"""
+import os
 from app import create_app
+from config import ProductionConfig
 
-app = create_app()
+# gunicorn.conf.py でスキーマを準備済みの場合、各ワーカーではスキーマ処理を省略する
+app = create_app(ProductionConfig, prepare_schema=os.environ.get('SCHEMA_PREPARED') != '1')
 
 if __name__ == '__main__':
     app.run()